@@ -1,43 +1,339 @@
 from __future__ import absolute_import
 from __future__ import print_function
 import argparse
+import functools
 import itertools
 import json
 import os
 import re
 import subprocess
+import sys
+import tempfile
 import traceback
+from collections import OrderedDict
 
-import git
 import six
 from six import iteritems
 
-from . import listen
-from .phab import listen as phablisten
 from . import log
-from .tasks import setup
-from .env import Environment
-from .gitutils import update_repositories
-from .load import get_syncs
 from .lock import RepoLock, SyncLock
 
 MYPY = False
 if MYPY:
-    from typing import Any, Iterable, List, Optional, Set, Text, Type, Union, cast
+    from typing import (Any, Callable, Dict, Iterable, List, Optional, Set, Text, Tuple, Type,
+                        Union, cast)
     from git.repo.base import Repo
+    from sync.env import Environment
     from sync.sync import SyncProcess
     from sync.trypush import TryPush
 
 logger = log.get_logger(__name__)
-env = Environment()
+
+_DOWNSTREAM = sys.intern("downstream")
+_UPSTREAM = sys.intern("upstream")
+_LANDING = sys.intern("landing")
 
 # HACK for docker
 if "SHELL" not in os.environ:
     os.environ["SHELL"] = "/bin/bash"
 
 
-def get_parser():
-    # type () -> argparse.ArgumentParser
+@functools.lru_cache(maxsize=1)
+def get_env():
+    # type: () -> Environment
+    from . import env
+    return env.Environment()
+
+
+def _configure_update(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("--sync-type", nargs="*", help="Type of sync to update",
+                        choices=["upstream", "downstream"])
+    parser.add_argument("--status", nargs="*", help="Statuses of syncs to update e.g. open")
+    parser.set_defaults(func=do_update)
+
+
+def _configure_update_tasks(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("pr_id", nargs="?", type=int,
+                        help="Downstream PR id for sync to update")
+    parser.set_defaults(func=do_update_tasks)
+
+
+def _configure_list(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("sync_type", nargs="*", help="Type of sync to list")
+    parser.add_argument("--error", action="store_true", help="List only syncs with errors")
+    parser.set_defaults(func=do_list)
+
+
+def _configure_detail(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("sync_type", help="Type of sync")
+    parser.add_argument("obj_id", type=int, help="Bug or PR id for the sync")
+    parser.set_defaults(func=do_detail)
+
+
+def _configure_landing(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("--prev-wpt-head", help="First commit to use as the base")
+    parser.add_argument("--wpt-head", help="wpt commit to land to")
+    parser.add_argument("--no-push", dest="push", action="store_false", default=True,
+                        help="Don't actually push anything to gecko")
+    parser.add_argument("--include-incomplete", action="store_true", default=False,
+                        help="Consider PRs with incomplete syncs as landable.")
+    parser.add_argument("--accept-failures", action="store_true", default=False,
+                        help="Consider the latest try push a success even if it has "
+                        "more than the allowed number of failures")
+    parser.add_argument("--retry", action="store_true", default=False,
+                        help="Rebase onto latest central and do another try push")
+    parser.set_defaults(func=do_landing)
+
+
+def _configure_repo_config(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.set_defaults(func=do_configure_repos)
+    parser.add_argument('repo', choices=['gecko', 'web-platform-tests', 'wpt-metadata'])
+    parser.add_argument('config_file', help="Path to git config file to copy.")
+
+
+def _configure_listen(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.set_defaults(func=do_start_listener)
+
+
+def _configure_phab_listen(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.set_defaults(func=do_start_phab_listener)
+
+
+def _configure_pr(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("pr_ids", default=None, type=int, nargs="*", help="PR numbers")
+    parser.add_argument("--rebase", default=False, action="store_true",
+                        help="Force the PR to be rebase onto the integration branch")
+    parser.set_defaults(func=do_pr)
+
+
+def _configure_bug(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("bug", default=None, nargs="?", help="Bug number")
+    parser.set_defaults(func=do_bug)
+
+
+def _configure_push(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("--base-rev", help="Base revision for push or landing")
+    parser.add_argument("--rev", help="Revision pushed")
+    parser.add_argument("--process", dest="processes", action="append",
+                        choices=["landing", "upstream"],
+                        default=None,
+                        help="Select process to run on push (default: landing, upstream)")
+    parser.set_defaults(func=do_push)
+
+
+def _configure_delete(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("sync_type", choices=["downstream", "upstream", "landing"],
+                        help="Type of sync to delete")
+    parser.add_argument("obj_ids", nargs="+", type=int,
+                        help="Bug or PR id for the sync(s)")
+    parser.add_argument("--seq-id", default=None, type=int, help="Sync sequence id")
+    parser.add_argument("--all", dest="delete_all", action="store_true",
+                        help="Delete all matches, not just most recent")
+    parser.add_argument("--try", dest="try_push",
+                        action="store_true", help="Delete try pushes for a sync")
+    parser.set_defaults(func=do_delete)
+
+
+def _configure_worktree(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("sync_type", help="Type of sync")
+    parser.add_argument("obj_id", type=int, help="Bug or PR id for the sync")
+    parser.add_argument("worktree_type", choices=["gecko", "wpt"],
+                        help="Repo type of worktree")
+    parser.set_defaults(func=do_worktree)
+
+
+def _configure_status(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("obj_type", choices=["try", "sync"],
+                        help="Object type")
+    parser.add_argument("sync_type", choices=["downstream", "upstream", "landing"],
+                        help="Sync type")
+    parser.add_argument("obj_id", type=int, help="Object id (pr number or bug)")
+    parser.add_argument("new_status", help="Status to set")
+    parser.add_argument("--old-status", help="Current status")
+    parser.add_argument("--seq-id", default=None, type=int, help="Sequence number")
+    parser.set_defaults(func=do_status)
+
+
+def _configure_test(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("--no-flake8", dest="flake8", action="store_false",
+                        default=True, help="Don't run flake8")
+    parser.add_argument("--no-pytest", dest="pytest", action="store_false",
+                        default=True, help="Don't run pytest")
+    parser.add_argument("--no-mypy", dest="mypy", action="store_false",
+                        help="Don't run mypy")
+    parser.add_argument("--isolated", action="store_true",
+                        help="Run pytest in a separate process")
+    parser.add_argument("args", nargs="*", help="Arguments to pass to pytest")
+    parser.set_defaults(func=do_test)
+
+
+def _configure_cleanup(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.set_defaults(func=do_cleanup)
+
+
+def _configure_skip(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("pr_ids", type=int, nargs="*", help="PR ids for which to skip")
+    parser.set_defaults(func=do_skip)
+
+
+def _configure_notify(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("pr_ids", nargs="*", type=int, help="PR ids for which to notify "
+                        "(tries to use the PR for the current working directory "
+                        "if not specified)")
+    parser.add_argument("--force", action="store_true",
+                        help="Run even if the sync is already marked as notified")
+    parser.set_defaults(func=do_notify)
+
+
+def _configure_landable(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("--prev-wpt-head", help="First commit to use as the base")
+    parser.add_argument("--quiet", action="store_false", dest="include_all", default=True,
+                        help="Only print the first PR with an error")
+    parser.add_argument("--blocked", action="store_true", dest="blocked", default=False,
+                        help="Only print unlandable PRs that are blocking")
+    parser.add_argument("--retrigger", action="store_true", default=False,
+                        help="Try to update all unlanded PRs that aren't Ready "
+                        "(requires --all)")
+    parser.add_argument("--include-incomplete", action="store_true", default=False,
+                        help="Consider PRs with incomplete syncs as landable.")
+    parser.set_defaults(func=do_landable)
+
+
+def _configure_retrigger(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("--no-upstream", action="store_false", default=True,
+                        dest="upstream", help="Don't retrigger upstream syncs")
+    parser.add_argument("--no-downstream", action="store_false", default=True,
+                        dest="downstream", help="Don't retrigger downstream syncs")
+    parser.add_argument("--rebase", default=False, action="store_true",
+                        help="Force downstream syncs to be rebased onto the "
+                        "integration branch")
+    parser.set_defaults(func=do_retrigger)
+
+
+def _configure_add_try(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("try_rev", help="Revision on try")
+    parser.add_argument("sync_type", nargs="?", choices=["downstream", "landing"],
+                        help="Revision on try")
+    parser.add_argument("sync_id", nargs="?", type=int,
+                        help="PR id for downstream sync or bug number "
+                        "for upstream sync")
+    parser.add_argument("--stability", action="store_true",
+                        help="Push is stability try push")
+    parser.add_argument("--rebuild-count", default=None, type=int,
+                        help="Rebuild count")
+    parser.set_defaults(func=do_try_push_add)
+
+
+def _configure_download_logs(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("--log-path",
+                        help="Destination path for the logs")
+    parser.add_argument("taskgroup_id", help="id of the taskgroup (decision task)")
+    parser.set_defaults(func=do_download_logs)
+
+
+def _configure_bug_update(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.set_defaults(func=do_bugupdate)
+
+
+def _configure_build_index(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.add_argument("index_name", nargs="*",
+                        help="Index names to rebuild (default all)")
+    parser.set_defaults(func=do_build_index)
+
+
+def _configure_migrate(parser):
+    # type: (argparse.ArgumentParser) -> None
+    parser.set_defaults(func=do_migrate)
+
+
+# Map of subcommand name to (help, configure function). Building every
+# subparser is the main cost of parsing the command line, so get_parser
+# only configures the subcommands that can actually be selected.
+subcommands = OrderedDict([
+    ("update", ("Update the local state by reading from GH + etc.", _configure_update)),
+    ("update-tasks", ("Update the state of try pushes", _configure_update_tasks)),
+    ("list", ("List all in-progress syncs", _configure_list)),
+    ("detail", ("List all in-progress syncs", _configure_detail)),
+    ("landing", ("Trigger the landing code", _configure_landing)),
+    ("repo-config", ("Configure repo.", _configure_repo_config)),
+    ("listen", ("Start pulse listener", _configure_listen)),
+    ("phab-listen", ("Start phabricator listener", _configure_phab_listen)),
+    ("pr", ("Update the downstreaming for a specific PR", _configure_pr)),
+    ("bug", ("Update the upstreaming for a specific bug", _configure_bug)),
+    ("push", ("Run the push handler", _configure_push)),
+    ("delete", ("Delete a sync by bug number or pr", _configure_delete)),
+    ("worktree", ("Create worktree for a sync", _configure_worktree)),
+    ("status", ("Set the status of a Sync or Try push", _configure_status)),
+    ("test", ("Run the tests with pytest", _configure_test)),
+    ("cleanup", ("Run the cleanup code", _configure_cleanup)),
+    ("skip", ("Mark the sync for a PR as skip so that "
+              "it doesn't have to complete before a landing", _configure_skip)),
+    ("notify", ("Try to perform results notification "
+                "for specified PRs", _configure_notify)),
+    ("landable", ("Display commits from upstream "
+                  "that are able to land", _configure_landable)),
+    ("retrigger", ("Retrigger syncs that are not read", _configure_retrigger)),
+    ("add-try", ("Add a try push to an existing sync", _configure_add_try)),
+    ("download-logs", ("Download logs for a given try push", _configure_download_logs)),
+    ("bug-update", ("Run the bug update task", _configure_bug_update)),
+    ("build-index", ("Build indexes", _configure_build_index)),
+    ("migrate", ("Migrate to latest data storage format", _configure_migrate)),
+])  # type: OrderedDict[Text, Tuple[Text, Callable[[argparse.ArgumentParser], None]]]
+
+# Global options that consume the following argument
+_global_value_args = {"--profile", "--config"}
+
+
+def _sniff_subcommand(argv):
+    # type: (List[Text]) -> Optional[Text]
+    """Find the name of the subcommand that will be selected by argv.
+
+    Returns None if there is no subcommand, the global help will be
+    displayed, or the subcommand isn't known, in which case all the
+    subparsers are required."""
+    skip_next = False
+    for arg in argv:
+        if skip_next:
+            skip_next = False
+            continue
+        if arg in ("-h", "--help"):
+            return None
+        if arg.startswith("-"):
+            if arg in _global_value_args:
+                skip_next = True
+            continue
+        return arg if arg in subcommands else None
+    return None
+
+
+def get_parser(argv=None):
+    # type: (Optional[List[Text]]) -> argparse.ArgumentParser
+    if argv is None:
+        argv = sys.argv[1:]
     parser = argparse.ArgumentParser()
     subparsers = parser.add_subparsers()
     parser.add_argument("--pdb", action="store_true", help="Run in pdb")
@@ -45,211 +341,52 @@ def get_parser():
                         "specified filename")
     parser.add_argument("--config", action="append", help="Set a config option")
 
-    parser_update = subparsers.add_parser("update",
-                                          help="Update the local state by reading from GH + etc.")
-    parser_update.add_argument("--sync-type", nargs="*", help="Type of sync to update",
-                               choices=["upstream", "downstream"])
-    parser_update.add_argument("--status", nargs="*", help="Statuses of syncs to update e.g. open")
-    parser_update.set_defaults(func=do_update)
-
-    parser_update_tasks = subparsers.add_parser("update-tasks",
-                                                help="Update the state of try pushes")
-    parser_update_tasks.add_argument("pr_id", nargs="?", type=int,
-                                     help="Downstream PR id for sync to update")
-    parser_update_tasks.set_defaults(func=do_update_tasks)
-
-    parser_list = subparsers.add_parser("list", help="List all in-progress syncs")
-    parser_list.add_argument("sync_type", nargs="*", help="Type of sync to list")
-    parser_list.add_argument("--error", action="store_true", help="List only syncs with errors")
-    parser_list.set_defaults(func=do_list)
-
-    parser_detail = subparsers.add_parser("detail", help="List all in-progress syncs")
-    parser_detail.add_argument("sync_type", help="Type of sync")
-    parser_detail.add_argument("obj_id", type=int, help="Bug or PR id for the sync")
-    parser_detail.set_defaults(func=do_detail)
-
-    parser_landing = subparsers.add_parser("landing", help="Trigger the landing code")
-    parser_landing.add_argument("--prev-wpt-head", help="First commit to use as the base")
-    parser_landing.add_argument("--wpt-head", help="wpt commit to land to")
-    parser_landing.add_argument("--no-push", dest="push", action="store_false", default=True,
-                                help="Don't actually push anything to gecko")
-    parser_landing.add_argument("--include-incomplete", action="store_true", default=False,
-                                help="Consider PRs with incomplete syncs as landable.")
-    parser_landing.add_argument("--accept-failures", action="store_true", default=False,
-                                help="Consider the latest try push a success even if it has "
-                                "more than the allowed number of failures")
-    parser_landing.add_argument("--retry", action="store_true", default=False,
-                                help="Rebase onto latest central and do another try push")
-    parser_landing.set_defaults(func=do_landing)
-
-    parser_fetch = subparsers.add_parser("repo-config", help="Configure repo.")
-    parser_fetch.set_defaults(func=do_configure_repos)
-    parser_fetch.add_argument('repo', choices=['gecko', 'web-platform-tests', 'wpt-metadata'])
-    parser_fetch.add_argument('config_file', help="Path to git config file to copy.")
-
-    parser_listen = subparsers.add_parser("listen", help="Start pulse listener")
-    parser_listen.set_defaults(func=do_start_listener)
-
-    parser_listen = subparsers.add_parser("phab-listen", help="Start phabricator listener")
-    parser_listen.set_defaults(func=do_start_phab_listener)
-
-    parser_pr = subparsers.add_parser("pr", help="Update the downstreaming for a specific PR")
-    parser_pr.add_argument("pr_ids", default=None, type=int, nargs="*", help="PR numbers")
-    parser_pr.add_argument("--rebase", default=False, action="store_true",
-                           help="Force the PR to be rebase onto the integration branch")
-    parser_pr.set_defaults(func=do_pr)
-
-    parser_bug = subparsers.add_parser("bug", help="Update the upstreaming for a specific bug")
-    parser_bug.add_argument("bug", default=None, nargs="?", help="Bug number")
-    parser_bug.set_defaults(func=do_bug)
-
-    parser_push = subparsers.add_parser("push", help="Run the push handler")
-    parser_push.add_argument("--base-rev", help="Base revision for push or landing")
-    parser_push.add_argument("--rev", help="Revision pushed")
-    parser_push.add_argument("--process", dest="processes", action="append",
-                             choices=["landing", "upstream"],
-                             default=None,
-                             help="Select process to run on push (default: landing, upstream)")
-    parser_push.set_defaults(func=do_push)
-
-    parser_delete = subparsers.add_parser("delete", help="Delete a sync by bug number or pr")
-    parser_delete.add_argument("sync_type", choices=["downstream", "upstream", "landing"],
-                               help="Type of sync to delete")
-    parser_delete.add_argument("obj_ids", nargs="+", type=int,
-                               help="Bug or PR id for the sync(s)")
-    parser_delete.add_argument("--seq-id", default=None, type=int, help="Sync sequence id")
-    parser_delete.add_argument("--all", dest="delete_all", action="store_true",
-                               help="Delete all matches, not just most recent")
-    parser_delete.add_argument("--try", dest="try_push",
-                               action="store_true", help="Delete try pushes for a sync")
-    parser_delete.set_defaults(func=do_delete)
-
-    parser_worktree = subparsers.add_parser("worktree", help="Create worktree for a sync")
-    parser_worktree.add_argument("sync_type", help="Type of sync")
-    parser_worktree.add_argument("obj_id", type=int, help="Bug or PR id for the sync")
-    parser_worktree.add_argument("worktree_type", choices=["gecko", "wpt"],
-                                 help="Repo type of worktree")
-    parser_worktree.set_defaults(func=do_worktree)
-
-    parser_status = subparsers.add_parser("status", help="Set the status of a Sync or Try push")
-    parser_status.add_argument("obj_type", choices=["try", "sync"],
-                               help="Object type")
-    parser_status.add_argument("sync_type", choices=["downstream", "upstream", "landing"],
-                               help="Sync type")
-    parser_status.add_argument("obj_id", type=int, help="Object id (pr number or bug)")
-    parser_status.add_argument("new_status", help="Status to set")
-    parser_status.add_argument("--old-status", help="Current status")
-    parser_status.add_argument("--seq-id", default=None, type=int, help="Sequence number")
-    parser_status.set_defaults(func=do_status)
-
-    parser_test = subparsers.add_parser("test", help="Run the tests with pytest")
-    parser_test.add_argument("--no-flake8", dest="flake8", action="store_false",
-                             default=True, help="Don't run flake8")
-    parser_test.add_argument("--no-pytest", dest="pytest", action="store_false",
-                             default=True, help="Don't run pytest")
-    parser_test.add_argument("--no-mypy", dest="mypy", action="store_false",
-                             help="Don't run mypy")
-    parser_test.add_argument("args", nargs="*", help="Arguments to pass to pytest")
-    parser_test.set_defaults(func=do_test)
-
-    parser_cleanup = subparsers.add_parser("cleanup", help="Run the cleanup code")
-    parser_cleanup.set_defaults(func=do_cleanup)
-
-    parser_skip = subparsers.add_parser("skip",
-                                        help="Mark the sync for a PR as skip so that "
-                                        "it doesn't have to complete before a landing")
-    parser_skip.add_argument("pr_ids", type=int, nargs="*", help="PR ids for which to skip")
-    parser_skip.set_defaults(func=do_skip)
-
-    parser_notify = subparsers.add_parser("notify",
-                                          help="Try to perform results notification "
-                                          "for specified PRs")
-    parser_notify.add_argument("pr_ids", nargs="*", type=int, help="PR ids for which to notify "
-                               "(tries to use the PR for the current working directory "
-                               "if not specified)")
-    parser_notify.add_argument("--force", action="store_true",
-                               help="Run even if the sync is already marked as notified")
-    parser_notify.set_defaults(func=do_notify)
-
-    parser_landable = subparsers.add_parser("landable",
-                                            help="Display commits from upstream "
-                                            "that are able to land")
-    parser_landable.add_argument("--prev-wpt-head", help="First commit to use as the base")
-    parser_landable.add_argument("--quiet", action="store_false", dest="include_all", default=True,
-                                 help="Only print the first PR with an error")
-    parser_landable.add_argument("--blocked", action="store_true", dest="blocked", default=False,
-                                 help="Only print unlandable PRs that are blocking")
-    parser_landable.add_argument("--retrigger", action="store_true", default=False,
-                                 help="Try to update all unlanded PRs that aren't Ready "
-                                 "(requires --all)")
-    parser_landable.add_argument("--include-incomplete", action="store_true", default=False,
-                                 help="Consider PRs with incomplete syncs as landable.")
-    parser_landable.set_defaults(func=do_landable)
-
-    parser_retrigger = subparsers.add_parser("retrigger",
-                                             help="Retrigger syncs that are not read")
-    parser_retrigger.add_argument("--no-upstream", action="store_false", default=True,
-                                  dest="upstream", help="Don't retrigger upstream syncs")
-    parser_retrigger.add_argument("--no-downstream", action="store_false", default=True,
-                                  dest="downstream", help="Don't retrigger downstream syncs")
-    parser_retrigger.add_argument("--rebase", default=False, action="store_true",
-                                  help="Force downstream syncs to be rebased onto the "
-                                  "integration branch")
-    parser_retrigger.set_defaults(func=do_retrigger)
-
-    parser_try_push_add = subparsers.add_parser("add-try",
-                                                help="Add a try push to an existing sync")
-    parser_try_push_add.add_argument("try_rev", help="Revision on try")
-    parser_try_push_add.add_argument("sync_type", nargs="?", choices=["downstream", "landing"],
-                                     help="Revision on try")
-    parser_try_push_add.add_argument("sync_id", nargs="?", type=int,
-                                     help="PR id for downstream sync or bug number "
-                                     "for upstream sync")
-    parser_try_push_add.add_argument("--stability", action="store_true",
-                                     help="Push is stability try push")
-    parser_try_push_add.add_argument("--rebuild-count", default=None, type=int,
-                                     help="Rebuild count")
-    parser_try_push_add.set_defaults(func=do_try_push_add)
-
-    parser_download_logs = subparsers.add_parser("download-logs",
-                                                 help="Download logs for a given try push")
-    parser_download_logs.add_argument("--log-path",
-                                      help="Destination path for the logs")
-    parser_download_logs.add_argument("taskgroup_id", help="id of the taskgroup (decision task)")
-    parser_download_logs.set_defaults(func=do_download_logs)
-
-    parser_bugupdate = subparsers.add_parser("bug-update",
-                                             help="Run the bug update task")
-    parser_bugupdate.set_defaults(func=do_bugupdate)
-
-    parser_build_index = subparsers.add_parser("build-index",
-                                               help="Build indexes")
-    parser_build_index.add_argument("index_name", nargs="*",
-                                    help="Index names to rebuild (default all)")
-    parser_build_index.set_defaults(func=do_build_index)
-
-    parser_migrate = subparsers.add_parser("migrate",
-                                           help="Migrate to latest data storage format")
-    parser_migrate.set_defaults(func=do_migrate)
+    selected = _sniff_subcommand(argv)
+    if selected is not None:
+        # The per-command help is only shown in the top-level --help output
+        # so there's no need to register it when running a single command
+        configure = subcommands[selected][1]
+        configure(subparsers.add_parser(selected))
+    else:
+        for name, (help_text, configure) in iteritems(subcommands):
+            configure(subparsers.add_parser(name, help=help_text))
 
     return parser
 
 
+def current_branch(path=os.curdir):
+    # type: (Text) -> Optional[Text]
+    """Name of the branch checked out at path, or None if path isn't in a
+    git repository or HEAD is detached.
+
+    This reads HEAD in-process with libgit2, rather than going via GitPython."""
+    import pygit2
+    git_dir = pygit2.discover_repository(path)
+    if git_dir is None:
+        return None
+    repo = pygit2.Repository(git_dir)
+    if repo.head_is_detached or repo.head_is_unborn:
+        return None
+    return repo.head.shorthand
+
+
+@functools.lru_cache(maxsize=1)
 def sync_from_path(git_gecko, git_wpt):
     # type: (Repo, Repo) -> Optional[SyncProcess]
     from . import base
-    git_work = git.Repo(os.curdir)
-    branch = git_work.active_branch.name
+    branch = current_branch()
+    if branch is None:
+        return None
     parts = branch.split("/")
     if not parts[0] == "sync":
         return None
-    if parts[1] == "downstream":
+    if parts[1] == _DOWNSTREAM:
         from . import downstream
         cls = downstream.DownstreamSync  # type: Type[SyncProcess]
-    elif parts[1] == "upstream":
+    elif parts[1] == _UPSTREAM:
         from . import upstream
         cls = upstream.UpstreamSync
-    elif parts[1] == "landing":
+    elif parts[1] == _LANDING:
         from . import landing
         cls = landing.LandingSync
     else:
@@ -260,11 +397,57 @@ def sync_from_path(git_gecko, git_wpt):
     return cls(git_gecko, git_wpt, process_name)
 
 
+def _list_cache_path():
+    # type: () -> Text
+    config = get_env().config
+    return os.path.join(config["root"], config["paths"]["cache"], "list.json")
+
+
+def _load_list_cache(data_sha):
+    # type: (Text) -> Dict[Text, List[Text]]
+    """Load the cached output of the list command, keyed by arguments.
+
+    The cache is only valid whilst the sync data ref points at data_sha,
+    since all the listed information is read from that ref."""
+    try:
+        with open(_list_cache_path()) as f:
+            cache = json.load(f)
+    except (IOError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("sha") != data_sha:
+        return {}
+    return cache.get("entries", {})
+
+
+def _store_list_cache(data_sha, entries):
+    # type: (Text, Dict[Text, List[Text]]) -> None
+    path = _list_cache_path()
+    dirname = os.path.dirname(path)
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+    # Write to a temporary file and rename so that readers never see partial data
+    fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump({"sha": data_sha, "entries": entries}, f)
+    os.replace(tmp_path, path)
+
+
 def do_list(git_gecko, git_wpt, sync_type, error=False, **kwargs):
     # type: (Repo, Repo, Text, bool, **Any) -> None
     from . import downstream
     from . import landing
     from . import upstream
+    from .repos import pygit2_get
+
+    data_sha = str(pygit2_get(git_gecko).references[get_env().config["sync"]["ref"]].target)
+    cache_key = json.dumps([sorted(set(sync_type or [])), error])
+    cache_entries = _load_list_cache(data_sha)
+    lines = cache_entries.get(cache_key)
+    if lines is not None:
+        if lines:
+            print("\n".join(lines))
+        return
+
     syncs = []  # type: List[SyncProcess]
 
     def filter_sync(sync):
@@ -272,11 +455,13 @@ def do_list(git_gecko, git_wpt, sync_type, error=False, **kwargs):
             return sync.error is not None and sync.status == "open"
         return True
 
+    sync_types = set(sync_type) if sync_type else None
     for cls in [upstream.UpstreamSync, downstream.DownstreamSync, landing.LandingSync]:
-        if not sync_type or cls.sync_type in sync_type:
+        if sync_types is None or cls.sync_type in sync_types:
             syncs.extend(item for item in cls.load_by_status(git_gecko, git_wpt, "open")
                          if filter_sync(item))
 
+    lines = []
     for sync in syncs:
         extra = []
         if isinstance(sync, downstream.DownstreamSync):
@@ -292,19 +477,23 @@ def do_list(git_gecko, git_wpt, sync_type, error=False, **kwargs):
         if error_data is not None:
             msg = error_data["message"]
             if msg is not None:
-                error_msg = ("ERROR: %s" % msg.split("\n", 1)[0])
-        print("%s %s %s bug:%s PR:%s %s%s" %
-              ("*"if sync.error else " ",
-               sync.sync_type,
-               sync.status,
-               sync.bug,
-               sync.pr,
-               " ".join(extra),
-               error_msg))
+                error_msg = ("ERROR: %s" % msg.partition("\n")[0])
+        marker = "*" if error_data else " "
+        lines.append(f"{marker} {sync.sync_type} {sync.status} bug:{sync.bug} PR:{sync.pr} "
+                     f"{' '.join(extra)}{error_msg}")
+    if lines:
+        print("\n".join(lines))
+
+    cache_entries[cache_key] = lines
+    try:
+        _store_list_cache(data_sha, cache_entries)
+    except (IOError, OSError):
+        logger.warning("Failed to write list cache:\n%s" % traceback.format_exc())
 
 
 def do_detail(git_gecko, git_wpt, sync_type, obj_id, **kwargs):
     # type: (Repo, Repo, Text, int, **Any) -> None
+    from .load import get_syncs
     syncs = get_syncs(git_gecko, git_wpt, sync_type, obj_id)
     for sync in syncs:
         print(sync.output())
@@ -382,23 +571,24 @@ def do_update(git_gecko,  # type: Repo
     from . import upstream
     sync_classes = []  # type: List[type]
     if not sync_type:
-        sync_type = [u"upstream", u"downstream"]
+        sync_type = [_UPSTREAM, _DOWNSTREAM]
     for key in sync_type:
-        sync_classes.append({u"upstream": upstream.UpstreamSync,
-                             u"downstream": downstream.DownstreamSync}[key])
+        sync_classes.append({_UPSTREAM: upstream.UpstreamSync,
+                             _DOWNSTREAM: downstream.DownstreamSync}[key])
     update.update_from_github(git_gecko, git_wpt, sync_classes, status)
 
 
 def do_update_tasks(git_gecko, git_wpt, pr_id, **kwargs):
     # type: (Repo, Repo, int, **Any) -> None
     from . import update
-    update.update_taskgroup_ids(git_gecko, git_wpt)
-    update.update_tasks(git_gecko, git_wpt, pr_id)
+    update.update_taskgroups_and_tasks(git_gecko, git_wpt, pr_id)
 
 
 def do_pr(git_gecko, git_wpt, pr_ids, rebase=False, **kwargs):
     # type: (Repo, Repo, List[int], bool, **Any) -> None
     from . import update
+    from .gitutils import update_repositories
+    from .repos import pygit2_get
     if not pr_ids:
         sync = sync_from_path(git_gecko, git_wpt)
         if not sync:
@@ -409,11 +599,15 @@ def do_pr(git_gecko, git_wpt, pr_ids, rebase=False, **kwargs):
             return
         pr_ids = [sync.pr]
     for pr_id in pr_ids:
-        pr = env.gh_wpt.get_pull(pr_id)
+        pr = get_env().gh_wpt.get_pull(pr_id)
         if pr is None:
             logger.error("PR %s not found" % pr_id)
             continue
-        update_repositories(git_gecko, git_wpt)
+        # Webhooks often trigger the same PR several times in a row, so only
+        # fetch wpt if we don't already have the PR head. gecko is always
+        # fetched since the PR head doesn't tell us whether it is current.
+        update_repositories(git_gecko,
+                            git_wpt if pr.head.sha not in pygit2_get(git_wpt) else None)
         update.update_pr(git_gecko, git_wpt, pr, rebase)
 
 
@@ -442,7 +636,7 @@ def do_push(git_gecko,  # type: Repo
     # type: (...) -> None
     from . import update
     if rev is None:
-        rev = git_gecko.commit(env.config["gecko"]["refs"]["mozilla-inbound"]).hexsha
+        rev = git_gecko.commit(get_env().config["gecko"]["refs"]["mozilla-inbound"]).hexsha
 
     update.update_push(git_gecko, git_wpt, rev, base_rev=base_rev, processes=processes)
 
@@ -457,6 +651,7 @@ def do_delete(git_gecko,  # type: Repo
               **kwargs):
     # type: (...) -> None
     from . import trypush
+    from .load import get_syncs
     objs = []  # type: Iterable[Any]
     for obj_id in obj_ids:
         logger.info("%s %s" % (sync_type, obj_id))
@@ -469,6 +664,14 @@ def do_delete(git_gecko,  # type: Repo
             objs = get_syncs(git_gecko, git_wpt, sync_type, obj_id, seq_id=seq_id)
         if not delete_all and objs:
             objs = sorted(objs, key=lambda x: -int(x.process_name.seq_id))[:1]
+        if try_push:
+            if objs:
+                # All the try pushes are for the same sync, so share a lock
+                # and delete them in a single commit
+                with SyncLock.for_process(next(iter(objs)).process_name) as lock:
+                    assert isinstance(lock, SyncLock)
+                    trypush.TryPush.delete_many(lock, objs)
+            continue
         for obj in objs:
             with SyncLock.for_process(obj.process_name) as lock:
                 assert isinstance(lock, SyncLock)
@@ -484,6 +687,7 @@ def do_worktree(git_gecko,  # type: Repo
                 **kwargs  # type: Any
                 ):
     # type: (...) -> None
+    from .load import get_syncs
     attr_name = worktree_type + "_worktree"
     syncs = get_syncs(git_gecko, git_wpt, sync_type, obj_id)
     for sync in syncs:
@@ -495,18 +699,20 @@ def do_worktree(git_gecko,  # type: Repo
 
 def do_start_listener(git_gecko, git_wpt, **kwargs):
     # type: (Repo, Repo, **Any) -> None
-    listen.run_pulse_listener(env.config)
+    from . import listen
+    listen.run_pulse_listener(get_env().config)
 
 
 def do_start_phab_listener(git_gecko, git_wpt, **kwargs):
     # type: (Repo, Repo, **Any) -> None
-    phablisten.run_phabricator_listener(env.config)
+    from .phab import listen as phablisten
+    phablisten.run_phabricator_listener(get_env().config)
 
 
 def do_configure_repos(git_gecko, git_wpt, repo, config_file, **kwargs):
     # type: (Repo, Repo, Text, Text, **Any) -> None
     from . import repos
-    r = repos.wrappers[repo](env.config)
+    r = repos.wrappers[repo](get_env().config)
     with RepoLock(r.repo()):
         r.configure(os.path.abspath(os.path.normpath(config_file)))
 
@@ -537,11 +743,11 @@ def do_status(git_gecko,  # type: Repo
         else:
             objs = try_pushes
     else:
-        if sync_type == "upstream":
+        if sync_type == _UPSTREAM:
             cls = upstream.UpstreamSync  # type: Type[SyncProcess]
-        if sync_type == "downstream":
+        if sync_type == _DOWNSTREAM:
             cls = downstream.DownstreamSync
-        if sync_type == "landing":
+        if sync_type == _LANDING:
             cls = landing.LandingSync
         objs = cls.load_by_obj(git_gecko,
                                git_wpt,
@@ -581,8 +787,23 @@ def do_test(**kwargs):
             args.append("test")
 
         logger.info("Running pytest")
-        cmd = ["pytest", "-s", "-v", "-p", "no:cacheprovider"] + args
-        subprocess.check_call(cmd, cwd="/app/wpt-sync/")
+        pytest_args = ["-s", "-v", "-p", "no:cacheprovider"] + args
+        if kwargs.pop("isolated", False):
+            subprocess.check_call(["pytest"] + pytest_args, cwd="/app/wpt-sync/")
+        else:
+            # Run in this interpreter to avoid paying the startup cost again
+            import pytest
+            from . import settings
+            # The tests must load the test config rather than the one this process loaded
+            settings.clear()
+            cwd = os.getcwd()
+            os.chdir("/app/wpt-sync/")
+            try:
+                rv = pytest.main(pytest_args)
+            finally:
+                os.chdir(cwd)
+            if rv != 0:
+                raise subprocess.CalledProcessError(rv, ["pytest"] + pytest_args)
 
 
 def do_cleanup(git_gecko, git_wpt, **kwargs):
@@ -661,19 +882,31 @@ def do_landable(git_gecko,
     from .sync import LandableStatus
     from .downstream import DownstreamAction, DownstreamSync
     from .landing import current, load_sync_point, landable_commits, unlanded_with_type
+    from .repos import pygit2_get
 
-    current_landing = current(git_gecko, git_wpt)
+    if prev_wpt_head is None:
+        current_landing = current(git_gecko, git_wpt)
 
-    if current_landing:
-        print("Current landing will update head to %s" % current_landing.wpt_commits.head.sha1)
-        prev_wpt_head = current_landing.wpt_commits.head.sha1
-    else:
-        sync_point = load_sync_point(git_gecko, git_wpt)
-        print("Last sync was to commit %s" % sync_point["upstream"])
-        prev_wpt_head = sync_point["upstream"]
+        if current_landing:
+            print("Current landing will update head to %s" %
+                  current_landing.wpt_commits.head.sha1)
+            prev_wpt_head = current_landing.wpt_commits.head.sha1
+        else:
+            sync_point = load_sync_point(git_gecko, git_wpt)
+            print("Last sync was to commit %s" % sync_point["upstream"])
+            prev_wpt_head = sync_point["upstream"]
+
+    # If nothing has landed upstream since the previous head there can't be
+    # any landable or unlandable PRs, so skip looking for them
+    pygit2_wpt = pygit2_get(git_wpt)
+    wpt_master = pygit2_wpt.revparse_single("origin/master").id
+    up_to_date = pygit2_wpt.revparse_single(prev_wpt_head).id == wpt_master
 
-    landable = landable_commits(git_gecko, git_wpt, prev_wpt_head,
-                                include_incomplete=include_incomplete)
+    if up_to_date:
+        landable = None
+    else:
+        landable = landable_commits(git_gecko, git_wpt, prev_wpt_head,
+                                    include_incomplete=include_incomplete)
 
     if landable is None:
         print("Next landing will not add any new commits")
@@ -684,7 +917,10 @@ def do_landable(git_gecko,
               (wpt_head, len(commits)))
 
     if include_all or retrigger:
-        unlandable = unlanded_with_type(git_gecko, git_wpt, wpt_head, prev_wpt_head)
+        if up_to_date:
+            unlandable = []
+        else:
+            unlandable = unlanded_with_type(git_gecko, git_wpt, wpt_head, prev_wpt_head)
         count = 0
         for pr, _, status in unlandable:
             count += 1
@@ -732,6 +968,7 @@ def do_retrigger(git_gecko, git_wpt, upstream=False, downstream=False, rebase=Fa
     from . import errors
     from . import update
     from . import upstream as upstream_sync
+    from .gitutils import update_repositories
     from .landing import current, load_sync_point, unlanded_with_type
 
     update_repositories(git_gecko, git_wpt)
@@ -789,11 +1026,11 @@ def do_try_push_add(git_gecko,  # type: Repo
         if sync_id is None:
             logger.error("A sync id is required when a sync type is supplied")
             return
-        if sync_type == "downstream":
+        if sync_type == _DOWNSTREAM:
             sync = downstream.DownstreamSync.for_pr(git_gecko,
                                                     git_wpt,
                                                     sync_id)
-        elif sync_type == "landing":
+        elif sync_type == _LANDING:
             syncs = landing.LandingSync.for_bug(git_gecko,
                                                 git_wpt,
                                                 sync_id,
@@ -844,7 +1081,6 @@ def do_download_logs(git_gecko,  # type: Repo
     # type: (...) -> None
     from . import tc
     from . import trypush
-    import tempfile
 
     if log_path is None:
         log_path = tempfile.mkdtemp()
@@ -862,7 +1098,7 @@ def do_download_logs(git_gecko,  # type: Repo
 def do_bugupdate(git_gecko, git_wpt, **kwargs):
     # type: (Repo, Repo, **Any) -> None
     from . import handlers
-    handlers.BugUpdateHandler(env.config)(git_gecko, git_wpt, {})
+    handlers.BugUpdateHandler(get_env().config)(git_gecko, git_wpt, {})
 
 
 def do_build_index(git_gecko, git_wpt, index_name, **kwargs):
@@ -887,6 +1123,7 @@ def do_migrate(git_gecko, git_wpt, **kwargs):
     from collections import defaultdict
     from . import base
 
+    import git
     import pygit2
 
     git2_gecko = pygit2.Repository(git_gecko.working_dir)
@@ -1072,7 +1309,7 @@ def set_config(opts):
     for opt in opts:
         keys, value = opt.split("=", 1)
         key_parts = keys.split(".")
-        target = env.config
+        target = get_env().config
         for key in key_parts[:-1]:
             target = target[key]
         logger.info("Setting config option %s from %s to %s" %
@@ -1101,11 +1338,14 @@ def main():
         def func(**kwargs):
             return do_test(**kwargs)
     else:
+        from .tasks import setup
         git_gecko, git_wpt = setup()
 
         def func(**kwargs):
             return args.func(git_gecko, git_wpt, **kwargs)
 
+    # There's no global lock here; commands that mutate a sync take the
+    # SyncLock for that sync, so read-only commands never wait on a lock
     try:
         func(**vars(args))
     except Exception:
@@ -137,6 +137,9 @@ class GitNotes(object):
 
     def __setitem__(self, key, value):
         # type: (Text, Text) -> None
+        if self._data.get(key) == value:
+            # Avoid creating a new notes commit when nothing changed
+            return
         self._data[key] = value
         data = u"\n".join(u"%s: %s" % item for item in iteritems(self._data))
         self.pygit2_repo.create_note(data,
@@ -185,6 +188,7 @@ class Commit(object):
         self._commit = _commit
         self._pygit2_commit = _pygit2_commit
         self._notes = None  # type: Optional[GitNotes]
+        self._metadata = None  # type: Optional[Dict[Text, Text]]
 
     def __eq__(self, other):
         # type: (Any) -> bool
@@ -251,7 +255,9 @@ class Commit(object):
     @property
     def metadata(self):
         # type: () -> Dict[Text, Text]
-        return get_metadata(self.msg)
+        if self._metadata is None:
+            self._metadata = get_metadata(self.msg)
+        return self._metadata
 
     @property
     def is_merge(self):
@@ -511,6 +517,11 @@ def _apply_patch(patch,  # type: bytes
 
 
 class GeckoCommit(Commit):
+    def __init__(self, repo, commit):
+        # type: (Repo, Union[str, Commit, GitPythonCommit, PyGit2Commit, Oid]) -> None
+        super(GeckoCommit, self).__init__(repo, commit)
+        self._commits_backed_out = None  # type: Optional[Tuple[List[GeckoCommit], Set[int]]]
+
     @property
     def bug(self):
         # type: () -> Optional[int]
@@ -538,15 +549,22 @@ class GeckoCommit(Commit):
     def is_downstream(self):
         # type: () -> bool
         from . import downstream
-        return downstream.DownstreamSync.has_metadata(self.msg)
+        return downstream.DownstreamSync.has_metadata_dict(self.metadata)
 
     @property
     def is_landing(self):
         # type: () -> bool
         from . import landing
-        return landing.LandingSync.has_metadata(self.msg)
+        return landing.LandingSync.has_metadata_dict(self.metadata)
 
     def commits_backed_out(self):
+        # type: () -> Tuple[List[GeckoCommit], Set[int]]
+        if self._commits_backed_out is None:
+            self._commits_backed_out = self._parse_commits_backed_out()
+        commits, bugs = self._commits_backed_out
+        return list(commits), set(bugs)
+
+    def _parse_commits_backed_out(self):
         # type: () -> Tuple[List[GeckoCommit], Set[int]]
         # TODO: should bugs be int here
         commits = []  # type: List[GeckoCommit]
@@ -561,9 +579,10 @@ class GeckoCommit(Commit):
 
             nodes, bugs = nodes_bugs
             # Assuming that all commits are listed.
-            for node in nodes:
-                git_sha = cinnabar(self.repo).hg2git(node.decode("ascii"))
-                commits.append(GeckoCommit(self.repo, git_sha))
+            hg_revs = [node.decode("ascii") for node in nodes]
+            git_shas = cinnabar(self.repo).hg2git_many(hg_revs)
+            for hg_rev in hg_revs:
+                commits.append(GeckoCommit(self.repo, git_shas[hg_rev]))
 
         return commits, set(bugs)
 
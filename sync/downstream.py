@@ -124,9 +124,16 @@ class DownstreamSync(SyncProcess):
     @classmethod
     def has_metadata(cls, message):
         # type: (bytes) -> bool
+        # Most messages have no sync metadata, so avoid parsing those
+        if b"wpt-pr: " not in message:
+            return False
+        return cls.has_metadata_dict(sync_commit.get_metadata(message))
+
+    @classmethod
+    def has_metadata_dict(cls, metadata):
+        # type: (Dict[Text, Text]) -> bool
         required_keys = ["wpt-commits",
                          "wpt-pr"]
-        metadata = sync_commit.get_metadata(message)
         return all(item in metadata for item in required_keys)
 
     @property
@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 import itertools
+import json
 import random
 import re
 import time
@@ -7,12 +8,14 @@ from io import StringIO
 
 import github
 import newrelic
+import requests
 import six
 from six.moves import urllib
 
 
 from . import log
 from .env import Environment
+from .errors import RetryableError
 MYPY = False
 if MYPY:
     from datetime import datetime
@@ -20,7 +23,7 @@ if MYPY:
     from github.Commit import Commit
     from github.PullRequest import PullRequest
     from github.Repository import Repository
-    from typing import Any, Dict, List, Optional, Text, Tuple, Union
+    from typing import Any, Dict, Iterable, List, Optional, Text, Tuple, Union
 
 logger = log.get_logger(__name__)
 env = Environment()
@@ -73,9 +76,24 @@ class CheckRun(github.GithubObject.NonCompletableGithubObject):
         return self._head_sha.value
 
 
+# Fields to fetch from a GraphQL PullRequest in get_check_runs_many
+_check_runs_fragment = (
+    "baseRefName "
+    "commits(last: 1) {nodes {commit {oid "
+    "checkSuites(first: 50) {pageInfo {hasNextPage} nodes {"
+    "checkRuns(first: 100) {pageInfo {hasNextPage} "
+    "nodes {databaseId name status conclusion}}}}}}}")
+
+
 class GitHub(object):
+    # Maximum number of PRs to include in a single GraphQL query
+    check_runs_batch_size = 50
+    graphql_url = "https://api.github.com/graphql"
+    graphql_timeout = 30
+
     def __init__(self, token, url):
         # type: (Text, Text) -> None
+        self.token = token
         self.gh = github.Github(token)
         self.repo_name = urllib.parse.urlsplit(url).path.lstrip("/")
         self.pr_cache = {}  # type: Dict[int, PullRequest]
@@ -243,6 +261,83 @@ class GitHub(object):
             }
         return rv
 
+    def get_check_runs_many(self, pr_ids):
+        # type: (Iterable[int]) -> Dict[int, Dict[Text, Dict[Text, Any]]]
+        """Get the check runs for the head commit of multiple PRs using one
+        GraphQL query per batch of PRs, rather than a REST request per PR.
+
+        The values have the same format as get_check_runs. PRs for which
+        the query failed, or which have more check suites or check runs than
+        fit in a single page, are omitted from the result, so callers should
+        fall back to get_check_runs for any missing PR. A request that times out
+        raises RetryableError."""
+        pr_ids = sorted({int(pr_id) for pr_id in pr_ids})
+        rv = {}  # type: Dict[int, Dict[Text, Dict[Text, Any]]]
+        required_by_branch = {}  # type: Dict[Text, List[Text]]
+        owner, name = self.repo_name.split("/", 1)
+        for start in range(0, len(pr_ids), self.check_runs_batch_size):
+            batch = pr_ids[start:start + self.check_runs_batch_size]
+            query = "query {repository(owner: %s, name: %s) {%s}}" % (
+                json.dumps(owner),
+                json.dumps(name),
+                " ".join("pr%i: pullRequest(number: %i) {%s}" % (pr_id, pr_id,
+                                                                 _check_runs_fragment)
+                         for pr_id in batch))
+            try:
+                data = self._graphql(query)
+            except (requests.RequestException, ValueError) as e:
+                logger.warning("Failed to get check runs for PRs %s: %s" %
+                               (", ".join(str(pr_id) for pr_id in batch), e))
+                continue
+            if data.get("errors"):
+                logger.warning("Errors getting check runs: %s" % data["errors"])
+            repo_data = (data.get("data") or {}).get("repository") or {}
+            for pr_id in batch:
+                pr_data = repo_data.get("pr%i" % pr_id)
+                if not pr_data or not pr_data["commits"]["nodes"]:
+                    continue
+                base_ref = pr_data["baseRefName"]
+                if base_ref not in required_by_branch:
+                    required_by_branch[base_ref] = self.required_checks(base_ref)
+                required_contexts = required_by_branch[base_ref]
+                commit = pr_data["commits"]["nodes"][0]["commit"]
+                suites = commit["checkSuites"]
+                if (suites["pageInfo"]["hasNextPage"] or
+                    any(suite["checkRuns"]["pageInfo"]["hasNextPage"]
+                        for suite in suites["nodes"])):
+                    logger.debug("Too many check runs to batch for PR %s" % pr_id)
+                    continue
+                checks = {}  # type: Dict[Text, Dict[Text, Any]]
+                id_by_name = {}  # type: Dict[Text, int]
+                for suite in suites["nodes"]:
+                    for item in suite["checkRuns"]["nodes"]:
+                        if (item["name"] in id_by_name and
+                            item["databaseId"] < id_by_name[item["name"]]):
+                            continue
+                        id_by_name[item["name"]] = item["databaseId"]
+                        checks[item["name"]] = {
+                            "status": item["status"].lower(),
+                            "conclusion": (item["conclusion"].lower()
+                                           if item["conclusion"] else None),
+                            "url": "%s/check-runs/%s" % (self.repo.url, item["databaseId"]),
+                            "required": item["name"] in required_contexts,
+                            "head_sha": commit["oid"]
+                        }
+                rv[pr_id] = checks
+        return rv
+
+    def _graphql(self, query):
+        # type: (Text) -> Dict[Text, Any]
+        try:
+            resp = requests.post(self.graphql_url,
+                                 json={"query": query},
+                                 headers={"Authorization": "bearer %s" % self.token},
+                                 timeout=self.graphql_timeout)
+        except requests.Timeout as e:
+            raise RetryableError(e)
+        resp.raise_for_status()
+        return resp.json()
+
     def _get_check_runs(self, sha1, check_name=None):
         query = []
         if check_name:
@@ -556,6 +651,10 @@ class MockGitHub(GitHub):
                 del rv[item["name"]]["name"]
         return rv
 
+    def get_check_runs_many(self, pr_ids):
+        # type: (Iterable[int]) -> Dict[int, Dict[Text, Dict[Text, Any]]]
+        return {int(pr_id): self.get_check_runs(pr_id) for pr_id in pr_ids}
+
     def pull_state(self, pr_id):
         # type: (int) -> Text
         pr = self.get_pull(pr_id)
@@ -10,7 +10,7 @@ from . import log
 from .env import Environment
 from .errors import RetryableError
 from .lock import RepoLock
-from .repos import cinnabar
+from .repos import cinnabar, is_ancestor, pygit2_get
 
 MYPY = False
 if MYPY:
@@ -69,8 +69,13 @@ def until(func, cond, max_tries=5):
     return True
 
 
-def _fetch(git_gecko, remote):
-    cmd = ["git", "--git-dir", git_gecko.git_dir, "fetch", remote]
+def _fetch(git_gecko, *remotes):
+    cmd = ["git", "--git-dir", git_gecko.git_dir, "fetch"]
+    if len(remotes) > 1:
+        # Remotes are fetched one after another; they all write the same cinnabar
+        # metadata so running them in parallel with --jobs isn't safe
+        cmd.append("--multiple")
+    cmd.extend(remotes)
     logger.info(" ".join(cmd))
     subprocess.check_call(cmd)
 
@@ -78,13 +83,13 @@ def _fetch(git_gecko, remote):
 def _update_gecko(git_gecko):
     # type: (Repo) -> None
     with RepoLock(git_gecko):
-        logger.info("Fetching mozilla-unified")
+        remotes = ["mozilla"]
+        if "autoland" in [item.name for item in git_gecko.remotes]:
+            remotes.append("autoland")
+        logger.info("Fetching mozilla-unified%s" % (" and autoland" if len(remotes) > 1 else ""))
         # Not using the built in fetch() function since that tries to parse the output
         # and sometimes fails
-        _fetch(git_gecko, "mozilla")
-        if "autoland" in [item.name for item in git_gecko.remotes]:
-            logger.info("Fetching autoland")
-            _fetch(git_gecko, "autoland")
+        _fetch(git_gecko, *remotes)
 
 
 def _update_wpt(git_wpt):
@@ -121,8 +126,11 @@ def gecko_repo(git_gecko, head):
              [(name, ref) for name, ref in iteritems(env.config["gecko"]["refs"])
               if name != "central"])
 
+    pygit2_gecko = pygit2_get(git_gecko)
+    head_id = pygit2_gecko.revparse_single(head.hexsha).id
     for name, ref in repos:
-        if git_gecko.is_ancestor(head, git_gecko.rev_parse(ref)):
+        ref_id = pygit2_gecko.revparse_single(ref).id
+        if is_ancestor(pygit2_gecko, head_id, ref_id):
             return name
     return None
 
@@ -151,9 +151,13 @@ class LandingSync(SyncProcess):
     @classmethod
     def has_metadata(cls, message):
         # type: (bytes) -> bool
+        return cls.has_metadata_dict(sync_commit.get_metadata(message))
+
+    @classmethod
+    def has_metadata_dict(cls, metadata):
+        # type: (Dict[Text, Text]) -> bool
         required_keys = ["wpt-head",
                          "wpt-type"]
-        metadata = sync_commit.get_metadata(message)
         return (all(item in metadata for item in required_keys) and
                 metadata.get("wpt-type") == "landing")
 
@@ -1059,7 +1063,7 @@ def wpt_push(git_gecko, git_wpt, commits, create_missing=True):
         # This causes the PR to be recorded as a note
         commit = sync_commit.WptCommit(git_wpt, commit_sha)
         pr = commit.pr()
-        if pr is not None and not upstream.UpstreamSync.has_metadata(commit.msg):
+        if pr is not None and not upstream.UpstreamSync.has_metadata_dict(commit.metadata):
             prs.add(pr)
     if create_missing:
         for pr in prs:
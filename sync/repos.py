@@ -13,7 +13,7 @@ from . import log
 
 MYPY = False
 if MYPY:
-    from typing import Any, Dict, Text, Optional, Union
+    from typing import Any, Dict, Iterable, Text, Optional, Union
     from git.repo.base import Repo
     from git.objects.commit import Commit
     from pygit2.repository import Repository
@@ -155,6 +155,20 @@ class Cinnabar(object):
             self.hg2git_cache[rev] = value
         return self.hg2git_cache[rev]
 
+    def hg2git_many(self, revs):
+        # type: (Iterable[Text]) -> Dict[Text, Text]
+        """Map several hg revs to git revs, running git cinnabar at most once"""
+        revs = list(revs)
+        missing = sorted({rev for rev in revs if rev not in self.hg2git_cache})
+        if missing:
+            values = self.git.cinnabar("hg2git", *missing).splitlines()
+            assert len(values) == len(missing)
+            for rev, value in zip(missing, values):
+                if all(c == "0" for c in value):
+                    raise ValueError("No git rev corresponding to hg rev %s" % rev)
+                self.hg2git_cache[rev] = value
+        return {rev: self.hg2git_cache[rev] for rev in revs}
+
     def git2hg(self, rev):
         # type: (Union[Text, Commit]) -> Text
         if rev not in self.git2hg_cache:
@@ -174,9 +188,20 @@ wrappers = {
 
 def pygit2_get(repo):
     # type: (Repo) -> Repository
-    if repo not in pygit2_map:
-        pygit2_map[repo] = pygit2.Repository(repo.git_dir)
-    return pygit2_map[repo]
+    # The pygit2 handle is opened once per repo and shared, so callers can
+    # call this freely rather than holding on to their own handle.
+    rv = pygit2_map.get(repo)
+    if rv is None:
+        rv = pygit2_map[repo] = pygit2.Repository(repo.git_dir)
+    return rv
+
+
+def is_ancestor(pygit2_repo, ancestor_id, descendant_id):
+    # type: (Repository, pygit2.Oid, pygit2.Oid) -> bool
+    """Check if ancestor_id is descendant_id or one of its ancestors. This is
+    git merge-base --is-ancestor computed in-process with libgit2."""
+    return (ancestor_id == descendant_id or
+            pygit2_repo.descendant_of(descendant_id, ancestor_id))
 
 
 def wrapper_get(repo):
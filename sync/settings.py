@@ -54,6 +54,13 @@ def load():
     return _config
 
 
+def clear():
+    # type: () -> None
+    """Drop the loaded config so that the next load() reads it from disk again"""
+    global _config
+    _config = None
+
+
 def load_files(ini_sync, ini_credentials):
     root, repo_root = get_root()
 
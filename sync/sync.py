@@ -127,6 +127,7 @@ class CommitRange(object):
 
         # Cache for the commits in this range
         self._commits = []  # type: Sequence[Commit]
+        self._commit_shas = None  # type: Optional[Set[Text]]
         self._head_sha = None  # type: Optional[Text]
         self._base_sha = None  # type: Optional[Text]
 
@@ -173,10 +174,17 @@ class CommitRange(object):
 
     def __contains__(self, other_commit):
         # type: (Any) -> bool
-        for commit in self:
-            if commit == other_commit:
-                return True
-        return False
+        commits = self.commits
+        if self._commit_shas is None:
+            self._commit_shas = {commit.sha1 for commit in commits}
+        # Match the comparisons made by Commit.__eq__
+        if hasattr(other_commit, "sha1"):
+            sha1 = other_commit.sha1
+        elif hasattr(other_commit, "hexsha"):
+            sha1 = other_commit.hexsha
+        else:
+            sha1 = other_commit
+        return sha1 in self._commit_shas
 
     @property
     def commits(self):
@@ -196,6 +204,7 @@ class CommitRange(object):
             commits.append(commit)
         commits = self.commit_filter.filter_commits(commits)  # type: ignore
         self._commits = commits
+        self._commit_shas = None
         self._head_sha = self.head.sha1
         self._base_sha = self.base.sha1
         return self._commits
@@ -228,6 +237,7 @@ class CommitRange(object):
         # Note that this doesn't actually update the stored value of the base
         # anywhere, unlike the head setter which will update the associated ref
         self._commits = []
+        self._commit_shas = None
         self._base_sha = value
         self._base = self.commit_cls(self.repo, value)
         self._base_commit = None
@@ -781,8 +791,7 @@ class SyncProcess(six.with_metaclass(IdentityMap, object)):
         # type: () -> Optional[TryPush]
         try_pushes = self.try_pushes()
         if try_pushes:
-            try_pushes = sorted(try_pushes, key=lambda x: x.process_name.seq_id)
-            return try_pushes[-1]
+            return max(try_pushes, key=lambda x: x.process_name.seq_id)
         return None
 
     def wpt_renames(self):
@@ -915,13 +924,12 @@ class SyncProcess(six.with_metaclass(IdentityMap, object)):
     def delete(self):
         # type: () -> None
         from . import index
+        from . import trypush
         for worktree in [self.gecko_worktree, self.wpt_worktree]:
             worktree.delete()
 
         assert self._lock is not None
-        for try_push in self.try_pushes():
-            with try_push.as_mut(self._lock):
-                try_push.delete()
+        trypush.TryPush.delete_many(self._lock, self.try_pushes())
 
         for git_repo, commit_cls in [(self.git_wpt, WptCommit),
                                      (self.git_gecko, GeckoCommit)]:
@@ -26,7 +26,8 @@ from .tc import TaskGroupView
 
 MYPY = False
 if MYPY:
-    from typing import Any, Dict, List, Mapping, MutableMapping, Optional, Text, Tuple, Union
+    from typing import (Any, Dict, Iterable, List, Mapping, MutableMapping, Optional, Text, Tuple,
+                        Union)
     from sync.downstream import DownstreamSync
     from sync.landing import LandingSync
     from sync.lock import SyncLock
@@ -557,6 +558,10 @@ class TryPush(base.ProcessData):
     @mut()
     def delete(self):
         super(TryPush, self).delete()
+        self._delete_index_entries()
+
+    def _delete_index_entries(self):
+        # type: () -> None
         for (idx_cls, data) in [(TaskGroupIndex, self.taskgroup_id),
                                 (TryCommitIndex, self.try_rev)]:
             if data is not None:
@@ -564,6 +569,25 @@ class TryPush(base.ProcessData):
                 key = idx.make_key(data)
                 idx.delete(key, data)
 
+    @classmethod
+    def delete_many(cls, lock, try_pushes):
+        # type: (SyncLock, Iterable[TryPush]) -> None
+        """Delete several try pushes, writing all the changes to the sync data in
+        a single commit rather than one commit per try push."""
+        from . import index
+        try_pushes = list(try_pushes)
+        if not try_pushes:
+            return
+        repo = try_pushes[0].repo
+        message = u"Delete %s\n\n" % ", ".join(item.path for item in try_pushes)
+        with base.CommitBuilder(repo, message=message, ref=env.config["sync"]["ref"]) as commit:
+            for try_push in try_pushes:
+                lock.check(*try_push.lock_key)
+                try_push._delete_data(u"", commit_builder=commit)
+                try_push._delete_index_entries()
+            for idx_cls in index.indicies:
+                idx_cls(repo).save(commit_builder=commit)
+
 
 class TryPushTasks(object):
     _retrigger_count = 6
@@ -19,6 +19,7 @@ MYPY = False
 if MYPY:
     from git import Repo
     from github.PullRequest import PullRequest
+    from sync.downstream import DownstreamSync
     from sync.sync import SyncProcess
     from sync.trypush import TryPush
     from typing import Any, Dict, Iterable, List, Optional, Text, Tuple, Type
@@ -303,6 +304,16 @@ def update_taskgroup_ids(git_gecko, git_wpt, try_push=None):
                                state)
 
 
+def downstream_sync_for_pr(git_gecko, git_wpt, pr_id):
+    # type: (Repo, Repo, int) -> Optional[DownstreamSync]
+    pr_syncs = downstream.DownstreamSync.load_by_obj(git_gecko, git_wpt, pr_id)
+    if not pr_syncs:
+        logger.error("No sync for pr_id %s" % pr_id)
+        return None
+    assert len(pr_syncs) == 1
+    return pr_syncs.pop()
+
+
 def update_tasks(git_gecko, git_wpt, pr_id=None, sync=None):
     # type: (Repo, Repo, Optional[int], Optional[SyncProcess]) -> None
     logger.info("Running update_tasks%s" % ("for PR %s" % pr_id if pr_id else ""))
@@ -310,12 +321,10 @@ def update_tasks(git_gecko, git_wpt, pr_id=None, sync=None):
     syncs = []  # type: Iterable[SyncProcess]
     if not sync:
         if pr_id is not None:
-            pr_syncs = downstream.DownstreamSync.load_by_obj(git_gecko, git_wpt, pr_id)
-            if not pr_syncs:
-                logger.error("No sync for pr_id %s" % pr_id)
+            pr_sync = downstream_sync_for_pr(git_gecko, git_wpt, pr_id)
+            if pr_sync is None:
                 return
-            assert len(pr_syncs) == 1
-            syncs = [pr_syncs.pop()]
+            syncs = [pr_sync]
         else:
             current_landing = landing.current(git_gecko, git_wpt)
             syncs = downstream.DownstreamSync.load_by_status(git_gecko, git_wpt, "open")
@@ -333,6 +342,24 @@ def update_tasks(git_gecko, git_wpt, pr_id=None, sync=None):
                 pass
 
 
+def update_taskgroups_and_tasks(git_gecko, git_wpt, pr_id=None):
+    # type: (Repo, Repo, Optional[int]) -> None
+    """Set any missing taskgroup ids and then update the task state for the latest
+    try pushes. When pr_id is supplied only the try pushes for that PR are read,
+    rather than every try push."""
+    if pr_id is None:
+        update_taskgroup_ids(git_gecko, git_wpt)
+        update_tasks(git_gecko, git_wpt)
+        return
+
+    sync = downstream_sync_for_pr(git_gecko, git_wpt, pr_id)
+    if sync is None:
+        return
+    for try_push in sync.try_pushes():
+        update_taskgroup_ids(git_gecko, git_wpt, try_push)
+    update_tasks(git_gecko, git_wpt, sync=sync)
+
+
 def retrigger(git_gecko, git_wpt, unlandable_prs, rebase=False):
     # type: (Repo, Repo, List[Tuple[int, List[Any], Text]], bool) -> List[int]
     from .sync import LandableStatus
@@ -1,5 +1,6 @@
 from __future__ import absolute_import
 import enum
+import functools
 import os
 import re
 import time
@@ -7,6 +8,7 @@ import traceback
 
 import git
 import newrelic
+import pygit2
 from bugsy.errors import BugsyException
 from github import GithubException
 from mozautomation import commitparser
@@ -15,22 +17,21 @@ from . import log
 from . import commit as sync_commit
 from .base import entry_point
 from .commit import GeckoCommit
-from .downstream import DownstreamSync
 from .errors import AbortError
 from .env import Environment
 from .gitutils import update_repositories, gecko_repo
 from .gh import AttrDict
 from .lock import SyncLock, constructor, mut
 from .sync import CommitFilter, LandableStatus, SyncProcess, CommitRange
-from .repos import cinnabar, pygit2_get
-from six import iteritems, itervalues
+from .repos import cinnabar, is_ancestor, pygit2_get
 
 MYPY = False
 if MYPY:
     from git.repo.base import Repo
     from sync.base import BranchRefObject, ProcessName
     from sync.commit import Commit
-    from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Text, Tuple, Union, cast
+    from typing import (Any, Dict, Iterable, Iterator, List, Optional, Pattern, Sequence, Set,
+                        Text, Tuple, Union, cast)
 
     CreateSyncs = Dict[Optional[int], Union[List, "Endpoints"]]
     UpdateSyncs = Dict[int, Tuple["UpstreamSync", GeckoCommit]]
@@ -53,7 +54,7 @@ class BackoutCommitFilter(CommitFilter):
         assert isinstance(commit, GeckoCommit)
         if commit.metadata.get("wptsync-skip"):
             return False
-        if DownstreamSync.has_metadata(commit.msg):
+        if commit.is_downstream:
             return False
         if commit.is_backout:
             commits, _ = commit.wpt_commits_backed_out()
@@ -89,6 +90,8 @@ class UpstreamSync(SyncProcess):
 
         self._upstreamed_gecko_commits = None  # type: Optional[List[GeckoCommit]]
         self._upstreamed_gecko_head = None  # type: Optional[Text]
+        # Map of wpt commit sha1 to the gecko commit it was upstreamed from, if any
+        self._upstreamed_by_wpt_sha = {}  # type: Dict[Text, Optional[GeckoCommit]]
 
     @classmethod
     @constructor(lambda args: ("upstream", args['bug']))
@@ -127,7 +130,7 @@ class UpstreamSync(SyncProcess):
                 body  # type: Optional[Text]
                 ):
         # type: (...) -> Optional[UpstreamSync]
-        gecko_commits = []
+        hg_revs = []
         bug = None
         integration_branch = None
 
@@ -138,8 +141,8 @@ class UpstreamSync(SyncProcess):
 
         for gh_commit in commits:
             commit = sync_commit.WptCommit(git_wpt, gh_commit.sha)
-            if cls.has_metadata(commit.msg):
-                gecko_commits.append(cinnabar(git_gecko).hg2git(commit.metadata["gecko-commit"]))
+            if cls.has_metadata_dict(commit.metadata):
+                hg_revs.append(commit.metadata["gecko-commit"])
                 commit_bug = env.bz.id_from_url(commit.metadata["bugzilla-url"])
                 if bug is not None and commit_bug != bug:
                     logger.error("Got multiple bug numbers in URL from commits")
@@ -155,12 +158,13 @@ class UpstreamSync(SyncProcess):
             else:
                 break
 
-        if not gecko_commits:
+        if not hg_revs:
             return None
 
         assert bug
-        gecko_base = git_gecko.rev_parse("%s^" % gecko_commits[0])
-        gecko_head = git_gecko.rev_parse(gecko_commits[-1])
+        git_revs = cinnabar(git_gecko).hg2git_many([hg_revs[0], hg_revs[-1]])
+        gecko_base = git_gecko.rev_parse("%s^" % git_revs[hg_revs[0]])
+        gecko_head = git_gecko.rev_parse(git_revs[hg_revs[-1]])
         wpt_head = commits[-1].sha
         wpt_base = commits[0].sha
 
@@ -170,9 +174,16 @@ class UpstreamSync(SyncProcess):
     @classmethod
     def has_metadata(cls, message):
         # type: (bytes) -> bool
+        # Most messages have no sync metadata, so avoid parsing those
+        if b"gecko-commit: " not in message:
+            return False
+        return cls.has_metadata_dict(sync_commit.get_metadata(message))
+
+    @classmethod
+    def has_metadata_dict(cls, metadata):
+        # type: (Dict[Text, Text]) -> bool
         required_keys = [u"gecko-commit",
                          u"bugzilla-url"]
-        metadata = sync_commit.get_metadata(message)
         return all(item in metadata for item in required_keys)
 
     def gecko_commit_filter(self):
@@ -230,15 +241,15 @@ class UpstreamSync(SyncProcess):
         # type: () -> Text
         if not self.remote_branch:
             pygit2_gecko = pygit2_get(self.git_gecko)
-            pygit2_wpt = pygit2_get(self.git_wpt)
-            if self.branch_name in pygit2_gecko.branches:
-                upstream = pygit2_gecko.branches[self.branch_name].upstream
+            branch = pygit2_gecko.lookup_branch(self.branch_name)
+            if branch is not None:
+                upstream = branch.upstream
                 if upstream:
                     self.remote_branch = upstream.shortname  # type: ignore
 
         if not self.remote_branch:
             count = 0
-            refs = pygit2_wpt.references
+            refs = pygit2_get(self.git_wpt).references
             initial_path = path = "refs/remotes/origin/gecko/%s" % self.bug
             while path in refs:
                 count += 1
@@ -251,46 +262,65 @@ class UpstreamSync(SyncProcess):
         # type: () -> List[GeckoCommit]
         if (self._upstreamed_gecko_commits is None or
             self._upstreamed_gecko_head != self.wpt_commits.head.sha1):
-            self._upstreamed_gecko_commits = [
-                sync_commit.GeckoCommit(self.git_gecko,
-                                        cinnabar(self.git_gecko).hg2git(
-                                            wpt_commit.metadata["gecko-commit"]))
-                for wpt_commit in self.wpt_commits
-                if "gecko-commit" in wpt_commit.metadata]
+            # Only look up the gecko commits for wpt commits we haven't seen before;
+            # typically the head moved because a commit was added
+            wpt_commits = list(self.wpt_commits)
+            wpt_shas = [wpt_commit.sha1 for wpt_commit in wpt_commits]
+            known = self._upstreamed_by_wpt_sha
+            hg_revs = {}
+            for wpt_commit in wpt_commits:
+                if wpt_commit.sha1 not in known:
+                    # Avoid parsing the metadata of commits that can't have come from gecko
+                    if b"gecko-commit" in wpt_commit.msg:
+                        hg_revs[wpt_commit.sha1] = wpt_commit.metadata.get("gecko-commit")
+                    else:
+                        hg_revs[wpt_commit.sha1] = None
+            git_revs = cinnabar(self.git_gecko).hg2git_many(
+                [hg_rev for hg_rev in hg_revs.values() if hg_rev is not None])
+            for wpt_sha, hg_rev in hg_revs.items():
+                known[wpt_sha] = (sync_commit.GeckoCommit(self.git_gecko, git_revs[hg_rev])
+                                  if hg_rev is not None else None)
+            self._upstreamed_by_wpt_sha = {wpt_sha: known[wpt_sha] for wpt_sha in wpt_shas}
+            self._upstreamed_gecko_commits = [known[wpt_sha] for wpt_sha in wpt_shas
+                                              if known[wpt_sha] is not None]
             self._upstreamed_gecko_head = self.wpt_commits.head.sha1
         return self._upstreamed_gecko_commits
 
     @mut()
     def update_wpt_commits(self):
         # type: () -> bool
-        if len(self.gecko_commits) == 0:
+        gecko_commits = list(self.gecko_commits)
+        if len(gecko_commits) == 0:
             return False
 
         # Find the commits that were already upstreamed. Some gecko commits may not
         # result in an upstream commit, if the patch has no effect. But if we find
         # the last commit that was previously upstreamed then all earlier ones must
         # also match.
+        upstreamed_count = len(self.upstreamed_gecko_commits)
         upstreamed_commits = {item.sha1 for item in self.upstreamed_gecko_commits}
-        matching_commits = list(self.gecko_commits[:])
-        for gecko_commit in reversed(list(self.gecko_commits)):
-            if gecko_commit.sha1 in upstreamed_commits:
+        matching_count = 0
+        for i in range(len(gecko_commits) - 1, -1, -1):
+            if gecko_commits[i].sha1 in upstreamed_commits:
+                matching_count = i + 1
                 break
-            matching_commits.pop()
 
-        if len(matching_commits) == len(self.gecko_commits) == len(self.upstreamed_gecko_commits):
+        if matching_count == len(gecko_commits) == upstreamed_count:
             return False
 
-        if len(matching_commits) == 0:
+        if matching_count == 0:
             self.wpt_commits.head = self.wpt_commits.base  # type: ignore
-        elif len(matching_commits) < len(self.upstreamed_gecko_commits):
-            self.wpt_commits.head = self.wpt_commits[len(matching_commits) - 1]  # type: ignore
+        elif matching_count < upstreamed_count:
+            self.wpt_commits.head = self.wpt_commits[matching_count - 1]  # type: ignore
 
-        # Ensure the worktree is clean
+        # Ensure the worktree is clean. libgit2's status doesn't report ignored
+        # files, so only the reset can be skipped when there are no changes
         wpt_work = self.wpt_worktree.get()
-        wpt_work.git.reset(hard=True)
+        if pygit2_get(wpt_work).status():
+            wpt_work.git.reset(hard=True)
         wpt_work.git.clean(f=True, d=True, x=True)
 
-        for commit in self.gecko_commits[len(matching_commits):]:
+        for commit in gecko_commits[matching_count:]:
             commit = self.add_commit(commit)
 
         assert (len(self.wpt_commits) ==
@@ -302,14 +332,22 @@ class UpstreamSync(SyncProcess):
         # type: () -> bool
         if not len(self.gecko_commits):
             return False
-        central_commit = self.git_gecko.rev_parse(env.config["gecko"]["refs"]["central"])
-        landed = [self.git_gecko.is_ancestor(commit.commit, central_commit)
-                  for commit in self.gecko_commits]
-        if not all(item == landed[0] for item in landed):
+        pygit2_gecko = pygit2_get(self.git_gecko)
+        central_id = pygit2_gecko.revparse_single(env.config["gecko"]["refs"]["central"]).id
+
+        def is_landed(commit):
+            # type: (GeckoCommit) -> bool
+            return is_ancestor(pygit2_gecko, pygit2.Oid(hex=commit.sha1), central_id)
+
+        # All the commits are ancestors of the head, so if that landed they all did
+        if is_landed(self.gecko_commits.head):
+            return True
+        # The range is linear, so the first commit is an ancestor of the others and
+        # if any of them landed that one must have done
+        if is_landed(self.gecko_commits[0]):
             logger.warning("Got some commits landed and some not for upstream sync %s" %
                            self.branch_name)
-            return False
-        return landed[0]
+        return False
 
     @property
     def repository(self):
@@ -390,10 +428,13 @@ class UpstreamSync(SyncProcess):
 
     def push_required(self):
         # type: () -> bool
-        return not (self.remote_branch and
-                    self.remote_branch in self.git_wpt.remotes.origin.refs and
-                    self.git_wpt.remotes.origin.refs[self.remote_branch].commit.hexsha ==
-                    self.wpt_commits.head.sha1)
+        if not self.remote_branch:
+            return True
+        refs = pygit2_get(self.git_wpt).references
+        path = "refs/remotes/origin/%s" % self.remote_branch
+        if path not in refs:
+            return True
+        return str(refs[path].peel().id) != self.wpt_commits.head.sha1
 
     @mut()
     def update_github(self):
@@ -454,13 +495,15 @@ class UpstreamSync(SyncProcess):
                                   context="upstream/gecko")
 
     @mut()
-    def try_land_pr(self):
-        # type: () -> bool
+    def try_land_pr(self, checks=None, gecko_landed=None):
+        # type: (Optional[Dict[Text, Dict[Text, Any]]], Optional[bool]) -> bool
         logger.info("Checking if sync for bug %s can land" % self.bug)
         if not self.status == "open":
             logger.info("Sync is %s" % self.status)
             return False
-        if not self.gecko_landed():
+        if gecko_landed is None:
+            gecko_landed = self.gecko_landed()
+        if not gecko_landed:
             logger.info("Commits are not yet landed in gecko")
             return False
 
@@ -483,7 +526,7 @@ class UpstreamSync(SyncProcess):
         logger.info("Commit are landable; trying to land %s" % self.pr)
 
         msg = None
-        check_status, checks = get_check_status(self.pr)
+        check_status, checks = get_check_status(self.pr, checks)
         if check_status not in [CheckStatus.SUCCESS, CheckStatus.PENDING]:
             details = ["Github PR %s" % env.gh_wpt.pr_url(self.pr)]
             msg = ("Can't merge web-platform-tests PR due to failing upstream checks:\n%s" %
@@ -557,17 +600,20 @@ class UpstreamSync(SyncProcess):
 
         pr_head = sync_commit.WptCommit(self.git_wpt, pr_head_sha)
 
-        merge_bases = []
+        merge_bases = []  # type: List[Any]
 
         # Check if the PR Head is reachable from origin/master
-        origin_master_sha = self.git_wpt.references['origin/master'].commit.hexsha
-        pr_head_reachable = self.git_wpt.is_ancestor(pr_head.commit,
-                                                     self.git_wpt.rev_parse('origin/master'))
+        pygit2_wpt = pygit2_get(self.git_wpt)
+        origin_master_id = pygit2_wpt.revparse_single("origin/master").id
+        pr_head_id = pygit2.Oid(hex=pr_head.sha1)
+        pr_head_reachable = is_ancestor(pygit2_wpt, pr_head_id, origin_master_id)
 
         # If not reachable, then it either hasn't landed yet, it was a Squash + Merge,
         # or a Rebase and merge.
         if not pr_head_reachable:
-            merge_bases = self.git_wpt.merge_base(origin_master_sha, pr_head.sha1)
+            merge_base_id = pygit2_wpt.merge_base(origin_master_id, pr_head_id)
+            if merge_base_id is not None:
+                merge_bases = [str(merge_base_id)]
         else:
             if not self.merge_sha:
                 raise ValueError('The merge SHA for %s could not be found in the UpstreamSync' %
@@ -578,7 +624,10 @@ class UpstreamSync(SyncProcess):
             parents = list(merge_commit.commit.parents)
             if len(parents) == 2 and pr_head in parents:
                 other_parent = parents[0] if parents[1] == pr_head.commit else parents[1]
-                merge_bases = self.git_wpt.merge_base(pr_head.sha1, other_parent)
+                merge_base_id = pygit2_wpt.merge_base(pr_head_id,
+                                                      pygit2.Oid(hex=other_parent.hexsha))
+                if merge_base_id is not None:
+                    merge_bases = [str(merge_base_id)]
 
             # Not a merge commit, so just use the base we have stored
             else:
@@ -601,6 +650,15 @@ class UpstreamSync(SyncProcess):
         return CommitRange(self.git_wpt, base, head_ref, sync_commit.WptCommit, CommitFilter())
 
 
+_SUMMARY_TRAILING_PUNCT = b"!#$%&(*+,-/:;<=>@[\\^_`{|~"
+
+
+@functools.lru_cache(maxsize=128)
+def _bug_prefix_re(bug_bytes):
+    # type: (bytes) -> Pattern[bytes]
+    return re.compile(br"^%s[^\w\d\[\(]*" % re.escape(bug_bytes))
+
+
 def commit_message_filter(msg):
     # type: (bytes) -> Tuple[bytes, Dict[Text, Text]]
     metadata = {}
@@ -608,8 +666,7 @@ def commit_message_filter(msg):
     if m:
         bug_bytes, bug_number = m.groups()[:2]
         if msg.startswith(bug_bytes):
-            prefix = re.compile(br"^%s[^\w\d\[\(]*" % bug_bytes)
-            msg = prefix.sub(b"", msg)
+            msg = _bug_prefix_re(bug_bytes).sub(b"", msg)
         metadata[u"bugzilla-url"] = env.bz.bugzilla_url(int(bug_number))
 
     reviewers = u", ".join(item.decode("utf8", "replace")
@@ -621,53 +678,108 @@ def commit_message_filter(msg):
     description = msg.splitlines()
     if description:
         summary = description.pop(0)
-        summary = summary.rstrip(b"!#$%&(*+,-/:;<=>@[\\^_`{|~").rstrip()
+        summary = summary.rstrip(_SUMMARY_TRAILING_PUNCT).rstrip()
         msg = summary + (b"\n" + b"\n".join(description) if description else b"")
 
     return msg, metadata
 
 
+def _pygit2_revwalk(repo, base_sha, head_sha, path):
+    # type: (pygit2.Repository, Text, Text, Text) -> Iterator[pygit2.Oid]
+    """Get the ids of non-merge commits in the range base_sha..head_sha whose tree
+    at path differs from their parent's, oldest first.
+
+    This gives the same commits as git rev-list --reverse --max-parents=1 base..head
+    -- path, except that there is no history simplification; commits on a merged
+    branch are included even if the merge discarded their changes to path. Commits
+    are ordered by commit time, but never before their parents."""
+    # Note that we can't use simplify_first_parent here; commits that reach the
+    # range through a merge (e.g. from autoland) must be included, we only want to
+    # skip the merge commits themselves
+    walker = repo.walk(repo.revparse_single(head_sha).id,
+                       pygit2.GIT_SORT_TOPOLOGICAL | pygit2.GIT_SORT_TIME |
+                       pygit2.GIT_SORT_REVERSE)
+    walker.hide(repo.revparse_single(base_sha).id)
+
+    def path_id(commit):
+        # type: (pygit2.Commit) -> Optional[pygit2.Oid]
+        try:
+            return commit.tree[path].id
+        except KeyError:
+            return None
+
+    for commit in walker:
+        if len(commit.parent_ids) > 1:
+            continue
+        parent_path_id = path_id(commit.parents[0]) if commit.parent_ids else None
+        if path_id(commit) != parent_path_id:
+            yield commit.id
+
+
 def wpt_commits(git_gecko, first_commit, head_commit):
     # type: (Repo, GeckoCommit, GeckoCommit) -> List[GeckoCommit]
     # List of syncs that have changed, so we can update them all as appropriate at the end
-    revish = u"%s..%s" % (first_commit.sha1, head_commit.sha1)
-    logger.info("Getting commits in range %s" % revish)
-    commits = [sync_commit.GeckoCommit(git_gecko, item.hexsha) for item in
-               git_gecko.iter_commits(revish,
-                                      paths=env.config["gecko"]["path"]["wpt"],
-                                      reverse=True,
-                                      max_parents=1)]
-    return filter_commits(commits)
+    return filter_commits(_unfiltered_wpt_commits(git_gecko, first_commit, head_commit))
+
+
+def _unfiltered_wpt_commits(git_gecko, first_commit, head_commit):
+    # type: (Repo, GeckoCommit, GeckoCommit) -> List[GeckoCommit]
+    logger.info("Getting commits in range %s..%s" % (first_commit.sha1, head_commit.sha1))
+    return [sync_commit.GeckoCommit(git_gecko, str(oid)) for oid in
+            _pygit2_revwalk(pygit2_get(git_gecko),
+                            first_commit.sha1,
+                            head_commit.sha1,
+                            env.config["gecko"]["path"]["wpt"])]
 
 
 def filter_commits(commits):
-    # type: (List[GeckoCommit]) -> List[GeckoCommit]
-    rv = []
-    for commit in commits:
-        if (commit.metadata.get("wptsync-skip") or
-            DownstreamSync.has_metadata(commit.msg) or
-            (commit.is_backout and not commit.wpt_commits_backed_out()[0])):
-            continue
-        rv.append(commit)
-    return rv
+    # type: (Iterable[GeckoCommit]) -> List[GeckoCommit]
+    """Remove commits that shouldn't be upstreamed, i.e. those marked with
+    wptsync-skip, downstreamed commits, and backouts of non-wpt commits"""
+    filtered, _ = filter_and_remove_backouts(commits)
+    return filtered
 
 
 def remove_complete_backouts(commits):
     # type: (Iterable[Commit]) -> Sequence[Commit]
     """Given a list of commits, remove any commits for which a backout exists
     in the list"""
-    commits_remaining = set()  # type: Set[Text]
+    _, remaining = filter_and_remove_backouts(commits, apply_filter=False)
+    return remaining
+
+
+def filter_and_remove_backouts(commits, apply_filter=True):
+    # type: (Iterable[Commit], bool) -> Tuple[List[GeckoCommit], List[GeckoCommit]]
+    """Apply filter_commits and remove_complete_backouts in a single pass over
+    the commits.
+
+    :param apply_filter: If False don't filter the commits, only remove complete backouts.
+    :returns: A tuple of (filtered commits, filtered commits with complete backouts removed)"""
+    filtered = []  # type: List[GeckoCommit]
+    keep = []  # type: List[bool]
+    # Map of sha1 to index in filtered for commits that haven't been backed out
+    commits_remaining = {}  # type: Dict[Text, int]
     for commit in commits:
         assert isinstance(commit, GeckoCommit)
+        if apply_filter and (commit.metadata.get("wptsync-skip") or commit.is_downstream):
+            continue
+        backed_out = None  # type: Optional[Set[Text]]
         if commit.is_backout:
             backed_out_commits, _ = commit.wpt_commits_backed_out()
-            backed_out = {item.sha1 for item in backed_out_commits}
-            if backed_out.issubset(commits_remaining):
-                commits_remaining -= backed_out
+            if apply_filter and not backed_out_commits:
                 continue
-        commits_remaining.add(commit.sha1)
+            backed_out = {item.sha1 for item in backed_out_commits}
+        i = len(filtered)
+        filtered.append(commit)
+        keep.append(True)
+        if backed_out is not None and all(sha1 in commits_remaining for sha1 in backed_out):
+            for sha1 in backed_out:
+                keep[commits_remaining.pop(sha1)] = False
+            keep[i] = False
+            continue
+        commits_remaining[commit.sha1] = i
 
-    return [item for item in commits if item.sha1 in commits_remaining]
+    return filtered, [commit for commit, keep_commit in zip(filtered, keep) if keep_commit]
 
 
 class Endpoints(object):
@@ -764,15 +876,14 @@ def updated_syncs_for_push(git_gecko,  # type: Repo
                            ):
     # type: (...) -> Optional[Tuple[CreateSyncs, UpdateSyncs]]
     # TODO: Check syncs with pushes that no longer exist on autoland
-    all_commits = wpt_commits(git_gecko, first_commit, head_commit)
+    all_commits, commits = filter_and_remove_backouts(
+        _unfiltered_wpt_commits(git_gecko, first_commit, head_commit))
     if not all_commits:
         logger.info("No new commits affecting wpt found")
         return None
     else:
         logger.info("Got %i commits since the last sync point" % len(all_commits))
 
-    commits = remove_complete_backouts(all_commits)
-
     if not commits:
         logger.info("No commits remain after removing backout pairs")
         return None
@@ -806,11 +917,16 @@ def updated_syncs_for_push(git_gecko,  # type: Repo
                     logger.warning("Lookup of upstream syncs for bug %s returned syncs: %r" %
                                    (len(syncs), syncs))
                     # Try to pick the most recent sync
+                    by_status = {}  # type: Dict[Text, List[UpstreamSync]]
+                    for item in syncs:
+                        by_status.setdefault(item.status, []).append(item)
                     for status in statuses:
-                        status_syncs = [s for s in syncs if s.status == status]
+                        status_syncs = by_status.get(status)
                         if status_syncs:
-                            status_syncs.sort(key=lambda x: int(x.process_name.obj_id))
-                            sync = status_syncs.pop()
+                            # Search in reverse so ties resolve to the last sync, as
+                            # with a stable sort followed by pop()
+                            sync = max(reversed(status_syncs),
+                                       key=lambda x: int(x.process_name.obj_id))
                             break
                 if syncs:
                     sync = syncs[0]
@@ -842,26 +958,31 @@ def create_syncs(lock,  # type: SyncLock
                  create_endpoints,  # type: Dict[Optional[int], Union[List, Endpoints]]
                  ):
     # type: (...) -> List[UpstreamSync]
-    rv = []
-    for bug, endpoints in iteritems(create_endpoints):
+    rv = []  # type: List[UpstreamSync]
+    if not create_endpoints:
+        return rv
+
+    for bug, endpoints in create_endpoints.items():
         if bug is not None:
             assert isinstance(endpoints, Endpoints)
             endpoints = [endpoints]
         assert isinstance(endpoints, list)
         for endpoint in endpoints:
-            if bug is None:
+            # Each commit without a bug gets its own new bug
+            sync_bug = bug
+            if sync_bug is None:
                 # TODO: Loading the commits doesn't work in this case, because we depend on the bug
                 commit = sync_commit.GeckoCommit(git_gecko, endpoint.head)
-                bug = env.bz.new("Upstream commit %s to web-platform-tests" %
-                                 commit.canonical_rev,
-                                 "",
-                                 "Testing",
-                                 "web-platform-tests",
-                                 whiteboard="[wptsync upstream]")
+                sync_bug = env.bz.new("Upstream commit %s to web-platform-tests" %
+                                      commit.canonical_rev,
+                                      "",
+                                      "Testing",
+                                      "web-platform-tests",
+                                      whiteboard="[wptsync upstream]")
             sync = UpstreamSync.new(lock,
                                     git_gecko,
                                     git_wpt,
-                                    bug=bug,
+                                    bug=sync_bug,
                                     gecko_base=endpoint.base.sha1,
                                     gecko_head=endpoint.head.sha1,
                                     wpt_base="origin/master",
@@ -875,7 +996,7 @@ def update_sync_heads(lock,  # type: SyncLock
                       ):
     # type: (...) -> List[UpstreamSync]
     rv = []
-    for bug, (sync, commit) in iteritems(syncs_by_bug):
+    for bug, (sync, commit) in syncs_by_bug.items():
         if sync.status not in ("open", "incomplete"):
             # TODO: Create a new sync with a non-zero seq-id in this case
             raise ValueError("Tried to modify a closed sync for bug %s with commit %s" %
@@ -889,6 +1010,18 @@ def update_sync_heads(lock,  # type: SyncLock
     return rv
 
 
+@functools.lru_cache(maxsize=8)
+def _parse_needinfo_users(value):
+    # type: (Text) -> Tuple[Text, ...]
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def _upstream_needinfo_users():
+    # type: () -> Tuple[Text, ...]
+    # Cached on the config value rather than globally, so a reloaded config is respected
+    return _parse_needinfo_users(env.config["gecko"]["needinfo"].get("upstream", ""))
+
+
 def update_modified_sync(git_gecko, git_wpt, sync):
     # type: (Repo, Repo, UpstreamSync) -> None
     assert sync._lock is not None
@@ -908,33 +1041,45 @@ def update_modified_sync(git_gecko, git_wpt, sync):
         sync.status = "open"  # type: ignore
         try:
             sync.update_wpt_commits()
-        except AbortError:
+        except AbortError as e:
             # If we got a merge conflict and the PR doesn't exist yet then try
             # recreating the commits on top of the current sync point in order that
             # we get a PR and it's visible that it fails
             if not sync.pr:
-                logger.info("Applying to origin/master failed; "
-                            "retrying with the current sync point")
+                # landing imports this module, so import lazily to avoid a cycle. The
+                # entry points import landing at startup, so this is just a sys.modules lookup
                 from .landing import load_sync_point
                 sync_point = load_sync_point(git_gecko, git_wpt)
-                sync.set_wpt_base(sync_point["upstream"])
-                try:
-                    sync.update_wpt_commits()
-                except AbortError:
+                pygit2_wpt = pygit2_get(git_wpt)
+                error = e  # type: Optional[AbortError]
+                # Only retry if the sync point differs from the base we just failed to
+                # apply on; otherwise the retry would fail in exactly the same way
+                if (pygit2_wpt.revparse_single(sync_point["upstream"]).id !=
+                    pygit2_wpt.revparse_single(sync.wpt_commits.base.sha1).id):
+                    logger.info("Applying to origin/master failed; "
+                                "retrying with the current sync point")
+                    sync.set_wpt_base(sync_point["upstream"])
+                    try:
+                        sync.update_wpt_commits()
+                    except AbortError as retry_e:
+                        error = retry_e
+                    else:
+                        error = None
+                else:
+                    logger.info("Applying to origin/master failed and the sync point is "
+                                "the same commit, so not retrying")
+                if error is not None:
                     # Reset the base to origin/master
                     sync.set_wpt_base("origin/master")
                     with env.bz.bug_ctx(sync.bug) as bug:
                         bug.add_comment("Failed to create upstream wpt PR due to "
                                         "merge conflicts. This requires fixup from a wpt sync "
                                         "admin.")
-                        needinfo_users = [item.strip() for item in
-                                          (env.config["gecko"]["needinfo"]
-                                           .get("upstream", "")
-                                           .split(","))]
-                        needinfo_users = [item for item in needinfo_users if item]
-                        bug.needinfo(*needinfo_users)
-                    raise
+                        bug.needinfo(*_upstream_needinfo_users())
+                    raise error
 
+    # This is needed even if the wpt commits didn't change, since it also reopens or
+    # closes the PR and updates the landed status; it only pushes if the remote differs
     sync.update_github()
 
 
@@ -953,6 +1098,9 @@ def update_sync_prs(lock,  # type: SyncLock
     to_push.extend(update_sync_heads(lock, update_syncs))
 
     for sync in to_push:
+        # as_mut doesn't acquire anything; it only marks the sync as writable under the
+        # SyncLock the caller already holds, and commits the changed sync data on exit.
+        # So there is no contention to reduce by narrowing this block.
         with sync.as_mut(lock):
             try:
                 update_modified_sync(git_gecko, git_wpt, sync)
@@ -973,9 +1121,17 @@ def update_sync_prs(lock,  # type: SyncLock
 def try_land_syncs(lock, syncs):
     # type: (SyncLock, Set[UpstreamSync]) -> Set[UpstreamSync]
     landed_syncs = set()
+    # Fetch the checks for every sync that might get as far as merging its PR together,
+    # rather than making a request per PR
+    checks_by_pr = {}  # type: Dict[int, Dict[Text, Dict[Text, Any]]]
+    landed_in_gecko = {sync: sync.gecko_landed() for sync in syncs if sync.status == "open"}
+    check_prs = [sync.pr for sync, landed in landed_in_gecko.items() if landed and sync.pr]
+    if len(check_prs) > 1:
+        checks_by_pr = env.gh_wpt.get_check_runs_many(check_prs)
     for sync in syncs:
         with sync.as_mut(lock):
-            if sync.try_land_pr():
+            if sync.try_land_pr(checks=checks_by_pr.get(sync.pr),
+                                gecko_landed=landed_in_gecko.get(sync)):
                 landed_syncs.add(sync)
     return landed_syncs
 
@@ -998,7 +1154,8 @@ def update_sync(git_gecko, git_wpt, sync, raise_on_error=True, repo_update=True)
                                                  update_syncs,
                                                  raise_on_error=raise_on_error)
 
-    if sync not in failed_syncs:
+    # failed_syncs holds (sync, error) pairs
+    if not any(failed_sync is sync for failed_sync, _ in failed_syncs):
         landed_syncs = try_land_syncs(sync._lock, [sync])
     else:
         landed_syncs = set()
@@ -1006,6 +1163,16 @@ def update_sync(git_gecko, git_wpt, sync, raise_on_error=True, repo_update=True)
     return pushed_syncs, failed_syncs, landed_syncs
 
 
+def _is_ancestor(repo, ancestor, descendant):
+    # type: (Repo, Text, Text) -> bool
+    """Equivalent to repo.is_ancestor, but computed in-process with libgit2 rather than by
+    running git merge-base --is-ancestor"""
+    pygit2_repo = pygit2_get(repo)
+    return is_ancestor(pygit2_repo,
+                       pygit2_repo.revparse_single(ancestor).id,
+                       pygit2_repo.revparse_single(descendant).id)
+
+
 @entry_point("upstream")
 def gecko_push(git_gecko,  # type: Repo
                git_wpt,  # type: Repo
@@ -1020,12 +1187,16 @@ def gecko_push(git_gecko,  # type: Repo
                                                                   repository_name)
 
     assert last_sync_point.commit is not None
-    if base_rev is None and git_gecko.is_ancestor(rev, last_sync_point.commit.commit):
-        logger.info("Last sync point moved past commit")
-        return None
 
     with SyncLock("upstream", None) as lock:
         assert isinstance(lock, SyncLock)
+        # Checked with the lock held so that the sync point can't move before we update it
+        # below, which means we don't need to repeat the check there
+        if base_rev is None and _is_ancestor(git_gecko, rev.hexsha,
+                                             last_sync_point.commit.sha1):
+            logger.info("Last sync point moved past commit")
+            return None
+
         updated = updated_syncs_for_push(git_gecko,
                                          git_wpt,
                                          prev_commit,
@@ -1043,6 +1214,8 @@ def gecko_push(git_gecko,  # type: Repo
                                                      update_syncs,
                                                      raise_on_error=raise_on_error)
 
+        # This is a lookup of a single SyncIndex path rather than a scan over all syncs, and
+        # it includes the status changes made by update_sync_prs above, so it isn't cached
         landable_syncs = {item for item in UpstreamSync.load_by_status(git_gecko, git_wpt, "open")
                           if item.error is None}
         if MYPY:
@@ -1052,7 +1225,8 @@ def gecko_push(git_gecko,  # type: Repo
         landed_syncs = try_land_syncs(lock, landable)
 
         # TODO
-        if not git_gecko.is_ancestor(rev, last_sync_point.commit.commit):
+        if base_rev is None or not _is_ancestor(git_gecko, rev.hexsha,
+                                                last_sync_point.commit.sha1):
             with last_sync_point.as_mut(lock):
                 last_sync_point.commit = rev.hexsha  # type: ignore
 
@@ -1066,27 +1240,45 @@ class CheckStatus(enum.Enum):
     FAILURE = "failure"
 
 
-def get_check_status(pr_id):
-    checks = env.gh_wpt.get_check_runs(pr_id)
-    if commit_checks_pass(checks):
-        status = CheckStatus.SUCCESS
-    elif not commit_checks_complete(checks):
-        status = CheckStatus.PENDING
-    else:
-        status = CheckStatus.FAILURE
-    return status, checks
+_PASSING_CONCLUSIONS = frozenset(["success", "neutral"])
 
 
-def commit_checks_pass(checks):
-    """Boolean indicating whether all required check runs pass"""
-    return all(item["required"] is False or (item["status"] == "completed" and
-                                             item["conclusion"] in ("success", "neutral"))
-               for item in itervalues(checks))
+def get_check_status(pr_id, checks=None):
+    if checks is None:
+        checks = env.gh_wpt.get_check_runs(pr_id)
+    status, _, _ = _summarize_checks(checks)
+    return status, checks
 
 
-def commit_checks_complete(checks):
-    """Boolean indicating whether all check runs are complete"""
-    return all(item["status"] == "completed" for item in itervalues(checks))
+def _summarize_checks(checks,  # type: Dict[Text, Dict[Text, Any]]
+                      ):
+    # type: (...) -> Tuple[CheckStatus, Optional[Text], List[Tuple[Text, Text]]]
+    """Summarize check runs in a single pass over the checks.
+
+    :returns: A tuple of (overall CheckStatus, head sha of the first check run,
+              list of (name, url) for check runs that didn't pass)"""
+    all_pass = True
+    all_complete = True
+    head_sha = None
+    failing = []
+    for name, item in checks.items():
+        if head_sha is None:
+            head_sha = item["head_sha"]
+        complete = item["status"] == "completed"
+        passed = item["conclusion"] in _PASSING_CONCLUSIONS
+        all_complete = all_complete and complete
+        if not (item["required"] is False or (complete and passed)):
+            all_pass = False
+        if not passed:
+            failing.append((name, item["url"]))
+
+    if all_pass:
+        status = CheckStatus.SUCCESS
+    elif not all_complete:
+        status = CheckStatus.PENDING
+    else:
+        status = CheckStatus.FAILURE
+    return status, head_sha, failing
 
 
 @entry_point("upstream")
@@ -1096,15 +1288,18 @@ def commit_check_changed(git_gecko, git_wpt, sync):
     if sync.status != "open":
         return True
 
-    check_status, checks = get_check_status(sync.pr)
+    pr = sync.pr
+    checks = env.gh_wpt.get_check_runs(pr)
 
     if not checks:
-        logger.error("No checks found for pr %s" % sync.pr)
+        logger.error("No checks found for pr %s" % pr)
         return
 
+    check_status, head_sha, failing = _summarize_checks(checks)
+
     # Record the overall status and commit so we only notify once per commit
     this_pr_check = {"state": check_status.value,
-                     "sha": next(itervalues(checks))["head_sha"]}
+                     "sha": head_sha}
     last_pr_check = sync.last_pr_check
     sync.last_pr_check = this_pr_check
 
@@ -1117,19 +1312,18 @@ def commit_check_changed(git_gecko, git_wpt, sync):
                            "Upstream web-platform-tests status checks passed, "
                            "PR will merge once commit reaches central.")
     elif check_status == CheckStatus.FAILURE and last_pr_check != this_pr_check:
-        details = ["Github PR %s" % env.gh_wpt.pr_url(sync.pr)]
-        for name, check_run in iteritems(checks):
-            if check_run["conclusion"] not in ("success", "neutral"):
-                details.append("* %s (%s)" % (name, check_run["url"]))
+        details = ["Github PR %s" % env.gh_wpt.pr_url(pr)]
+        for name, url in failing:
+            details.append("* %s (%s)" % (name, url))
         details = "\n".join(details)
         msg = ("Can't merge web-platform-tests PR due to failing upstream checks:\n%s" %
                details)
+        commit_author = sync.gecko_commits[0].email if len(sync.gecko_commits) else None
         try:
+            # BugContext posts the comment before it updates the flags, so the comment
+            # is still added if setting the needinfo fails
             with env.bz.bug_ctx(sync.bug) as bug:
                 bug["comment"] = msg
-            # Do this as a seperate operation
-            with env.bz.bug_ctx(sync.bug) as bug:
-                commit_author = sync.gecko_commits[0].email
                 if commit_author:
                     bug.needinfo(commit_author)
         except BugsyException:
@@ -1168,7 +1362,8 @@ def update_pr(git_gecko,  # type: Repo
         else:
             assert merge_sha is not None
             sync.merge_sha = merge_sha
-            if not sync.wpt_commits and base_sha:
+            # Check base_sha first since testing wpt_commits walks the commit range
+            if base_sha and not sync.wpt_commits:
                 sync.set_wpt_base(base_sha)
             if sync.status not in ("complete", "wpt-merged"):
                 env.bz.comment(sync.bug, "Upstream PR merged by %s" % merged_by)
@@ -0,0 +1,38 @@
+from sync import base, command, downstream, landing, upstream
+
+
+def test_list_cache(env, git_gecko, git_wpt, monkeypatch):
+    loaded = []
+
+    def load_by_status(cls, git_gecko, git_wpt, status):
+        loaded.append(cls.sync_type)
+        return set()
+
+    for cls in [upstream.UpstreamSync, downstream.DownstreamSync, landing.LandingSync]:
+        monkeypatch.setattr(cls, "load_by_status", classmethod(load_by_status))
+
+    def move_ref(path):
+        with base.CommitBuilder(git_gecko, message="Test",
+                                ref=env.config["sync"]["ref"]) as commit:
+            commit.add_tree({path: b"data"})
+
+    move_ref("test/initial")
+
+    command.do_list(git_gecko, git_wpt, ["upstream"])
+    assert loaded == ["upstream"]
+
+    # The ref hasn't moved, so the cached output is used
+    command.do_list(git_gecko, git_wpt, ["upstream"])
+    assert loaded == ["upstream"]
+
+    # Different arguments have their own entry
+    command.do_list(git_gecko, git_wpt, ["landing"])
+    assert loaded == ["upstream", "landing"]
+    command.do_list(git_gecko, git_wpt, ["landing"])
+    command.do_list(git_gecko, git_wpt, ["upstream"])
+    assert loaded == ["upstream", "landing"]
+
+    # Any change to the sync data invalidates the cache
+    move_ref("test/updated")
+    command.do_list(git_gecko, git_wpt, ["upstream"])
+    assert loaded == ["upstream", "landing", "upstream"]
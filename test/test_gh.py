@@ -0,0 +1,60 @@
+import pytest
+import requests
+import requests_mock
+
+from sync import gh
+from sync.errors import RetryableError
+
+
+def test_get_check_runs_many(monkeypatch):
+    gh_wpt = gh.GitHub("token", "https://github.com/web-platform-tests/wpt")
+    gh_wpt._repo = gh.AttrDict({"url": "https://api.github.com/repos/web-platform-tests/wpt"})
+    monkeypatch.setattr(gh_wpt, "required_checks", lambda branch: ["wpt-decision-task"])
+
+    def suites(runs, truncated=False):
+        return {"pageInfo": {"hasNextPage": False},
+                "nodes": [{"checkRuns": {"pageInfo": {"hasNextPage": truncated},
+                                         "nodes": runs}}]}
+
+    def pull(sha, check_suites):
+        return {"baseRefName": "master",
+                "commits": {"nodes": [{"commit": {"oid": sha,
+                                                  "checkSuites": check_suites}}]}}
+
+    runs = [{"databaseId": 1, "name": "wpt-decision-task", "status": "COMPLETED",
+             "conclusion": "FAILURE"},
+            {"databaseId": 3, "name": "wpt-decision-task", "status": "COMPLETED",
+             "conclusion": "SUCCESS"},
+            {"databaseId": 2, "name": "lint", "status": "IN_PROGRESS", "conclusion": None}]
+    data = {"data": {"repository": {"pr1": pull("a" * 40, suites(runs)),
+                                    "pr2": pull("b" * 40, suites(runs, truncated=True)),
+                                    "pr3": None}}}
+
+    with requests_mock.Mocker() as m:
+        m.register_uri("POST", gh.GitHub.graphql_url, json=data)
+        checks = gh_wpt.get_check_runs_many([1, 2, 3])
+        assert m.last_request.headers["Authorization"] == "bearer token"
+
+    # PRs that are truncated or missing are left for the caller to get over REST
+    assert checks == {
+        1: {"wpt-decision-task": {"status": "completed",
+                                  "conclusion": "success",
+                                  "url": ("https://api.github.com/repos/web-platform-tests/wpt/"
+                                          "check-runs/3"),
+                                  "required": True,
+                                  "head_sha": "a" * 40},
+            "lint": {"status": "in_progress",
+                     "conclusion": None,
+                     "url": "https://api.github.com/repos/web-platform-tests/wpt/check-runs/2",
+                     "required": False,
+                     "head_sha": "a" * 40}}
+    }
+
+
+def test_get_check_runs_many_timeout():
+    gh_wpt = gh.GitHub("token", "https://github.com/web-platform-tests/wpt")
+
+    with requests_mock.Mocker() as m:
+        m.register_uri("POST", gh.GitHub.graphql_url, exc=requests.exceptions.ConnectTimeout)
+        with pytest.raises(RetryableError):
+            gh_wpt.get_check_runs_many([1, 2])
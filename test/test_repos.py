@@ -0,0 +1,34 @@
+import pytest
+
+from sync import repos
+
+
+def test_hg2git_many(monkeypatch):
+    monkeypatch.setattr(repos.Cinnabar, "hg2git_cache", {"a" * 40: "1" * 40})
+    calls = []
+    git_revs = {"b" * 40: "2" * 40, "c" * 40: "3" * 40}
+
+    class Git(object):
+        def cinnabar(self, command, *revs):
+            assert command == "hg2git"
+            calls.append(revs)
+            return "\n".join(git_revs.get(rev, "0" * 40) for rev in revs)
+
+    class Repo(object):
+        git = Git()
+
+    cinnabar = repos.Cinnabar(Repo())
+    assert cinnabar.hg2git_many(["c" * 40, "a" * 40, "b" * 40]) == {"a" * 40: "1" * 40,
+                                                                    "b" * 40: "2" * 40,
+                                                                    "c" * 40: "3" * 40}
+    # Only the uncached revs are looked up, in a single call
+    assert calls == [("b" * 40, "c" * 40)]
+
+    assert cinnabar.hg2git_many(["a" * 40, "c" * 40]) == {"a" * 40: "1" * 40,
+                                                          "c" * 40: "3" * 40}
+    assert len(calls) == 1
+
+    with pytest.raises(ValueError):
+        cinnabar.hg2git_many(["b" * 40, "d" * 40])
+    assert calls[1] == ("d" * 40,)
+    assert "d" * 40 not in repos.Cinnabar.hg2git_cache
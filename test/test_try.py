@@ -1,7 +1,9 @@
+import pytest
 from mock import Mock, patch
 
-from sync import tc
+from sync import tc, trypush
 from sync.lock import SyncLock
+from sync.repos import pygit2_get
 
 
 def test_try_task_states(mock_tasks, try_push):
@@ -73,3 +75,29 @@ def test_download_logs(mock_tasks, try_push):
                     assert task_names.count("boo") == 1
                     assert task_names.count("baz") == 1
                     assert len(task_names) == 21
+
+
+def test_delete_many(env, git_gecko, git_wpt, try_push, MockTryCls):
+    sync = try_push.sync(git_gecko, git_wpt)
+    with SyncLock.for_process(sync.process_name) as lock:
+        with patch("sync.tree.is_open", Mock(return_value=True)):
+            with sync.as_mut(lock):
+                other_try_push = trypush.TryPush.create(lock, sync, try_cls=MockTryCls)
+        with other_try_push.as_mut(lock):
+            other_try_push.taskgroup_id = "ghijkl"
+        try_pushes = [try_push, other_try_push]
+
+        pygit2_repo = pygit2_get(git_gecko)
+        ref_name = env.config["sync"]["ref"]
+        initial_id = pygit2_repo.references[ref_name].target
+
+        trypush.TryPush.delete_many(lock, try_pushes)
+
+    # All the deletions are written in a single commit
+    head = pygit2_repo[pygit2_repo.references[ref_name].target]
+    assert head.parent_ids == [initial_id]
+    for item in try_pushes:
+        with pytest.raises(KeyError):
+            head.tree[item.path]
+        assert trypush.TryPush.for_commit(git_gecko, item.try_rev) is None
+        assert trypush.TryPush.for_taskgroup(git_gecko, item.taskgroup_id) is None
@@ -1,3 +1,5 @@
+import pygit2
+
 from sync import commit as sync_commit, upstream
 from sync.gitutils import update_repositories
 from sync.lock import SyncLock
@@ -567,3 +569,59 @@ def test_pr_commits_fast_forward(env, git_wpt, git_gecko, git_wpt_upstream,
 
     for wpt_commit, pr_commit in zip(sync.wpt_commits._commits, pr_commits):
         assert wpt_commit.commit == pr_commit.commit
+
+
+def test_filter_and_remove_backouts(git_gecko, git_wpt, upstream_gecko_commit,
+                                    upstream_gecko_backout):
+    bug = 1234
+    test_changes = {"README": b"Change README\n"}
+    rev = upstream_gecko_commit(test_changes=test_changes, bug=bug,
+                                message=b"Change README")
+    backout_rev = upstream_gecko_backout(rev, bug)
+    relanding_rev = upstream_gecko_commit(test_changes=test_changes, bug=bug,
+                                          message=b"Reland change README")
+
+    update_repositories(git_gecko, git_wpt, wait_gecko_commit=relanding_rev)
+    commits = [sync_commit.GeckoCommit(git_gecko, cinnabar(git_gecko).hg2git(item))
+               for item in [rev, backout_rev, relanding_rev]]
+
+    filtered, remaining = upstream.filter_and_remove_backouts(commits)
+    assert filtered == commits
+    assert remaining == [commits[2]]
+
+    assert upstream.filter_commits(commits) == filtered
+    assert upstream.remove_complete_backouts(commits) == remaining
+
+
+def test_pygit2_revwalk(git_wpt_upstream, monkeypatch):
+    repo = git_wpt_upstream
+    base = repo.head.commit.hexsha
+    branch = repo.active_branch.name
+    timestamps = iter(range(1600000000, 1600001000, 100))
+
+    def commit(message, file_data):
+        # Give each commit a distinct, increasing date so that rev-list's order is defined
+        date = "%i +0000" % next(timestamps)
+        monkeypatch.setenv("GIT_AUTHOR_DATE", date)
+        monkeypatch.setenv("GIT_COMMITTER_DATE", date)
+        if file_data is None:
+            repo.git.merge("side", no_ff=True, m=message)
+        else:
+            git_commit(repo, message, file_data)
+
+    repo.git.checkout("-b", "side")
+    commit(b"Side change", {"example/side.html": b"side\n"})
+    repo.git.checkout(branch)
+    commit(b"Main change", {"example/main.html": b"main\n"})
+    commit(b"Other change", {"other/file.html": b"other\n"})
+    commit("Merge side", None)
+    commit(b"Change after merge", {"example/main.html": b"main 2\n"})
+    head = repo.head.commit.hexsha
+
+    walked = [str(oid) for oid in
+              upstream._pygit2_revwalk(pygit2.Repository(repo.working_dir),
+                                       base, head, "example")]
+    expected = repo.git.rev_list("--reverse", "--max-parents=1", "%s..%s" % (base, head),
+                                 "--", "example").split()
+    assert len(walked) == 3
+    assert walked == expected